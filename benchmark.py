@@ -0,0 +1,278 @@
+
+"""Benchmarks of the hot paths: synthesis, mixing, WAV I/O and analysis\n
+every workload runs `--repeat` times (the fastest run counts) and once more under tracemalloc for its peak memory,
+the inputs are generated with a fixed seed, so runs on different commits do the same work\n
+`python benchmark.py --out before.json`, then on another commit `python benchmark.py --compare before.json`"""
+
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from dataclasses import asdict, dataclass
+from functools import partial
+from io import StringIO
+from math import sin, tau
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable
+
+import numpy as np
+
+from modules.helpers import rescale_values
+from modules.imager import display_amplitudes_img, display_stft
+from modules.sound_analyser import fft_full, fft_shorttime, peak_iter
+from modules.sound_generator import SAWTOOTH_WAVE, evolving_frequency, multi_sine, sine, wave
+from modules.track import RENDER_MEMO, FrozenMonoTrack, MonoTrack
+from modules.wav_rw import AudioData, read_wav_data, write_wav_data
+
+SAMPLE_RATE = 48000
+
+
+@dataclass
+class Workload:
+    name:       str
+    # seconds of audio the workload produces or consumes
+    audio_s:    float
+    # does the (untimed) setup, returns the timed part
+    prepare:    Callable[[], Callable[[], object]]
+
+
+@dataclass
+class Result:
+    name:       str
+    audio_s:    float
+    # fastest of the repeats
+    wall_time:  float
+    # bytes, None if not measured
+    peak_mem:   int | None
+
+    @property
+    def realtime_factor(self) -> float:
+        """seconds of audio per second of wall time"""
+        return self.audio_s / self.wall_time if self.wall_time else 0
+
+    def to_dict(self) -> dict:
+        return asdict(self) | {"realtime_factor": self.realtime_factor}
+
+
+# ==================
+def noise_audio(minutes: float, *, channels: int = 2, seed: int = 0) -> AudioData:
+    """16 bit noise, the same for every run"""
+    rng = np.random.default_rng(seed)
+    bloc_n = int(minutes * 60 * SAMPLE_RATE)
+    samples = rng.integers(-1 << 15, 1 << 15, size=(bloc_n, channels), dtype=np.int16)
+    return AudioData(2, samples, channels=channels, sample_rate=SAMPLE_RATE)
+
+def chord_snippet(dur_s: float) -> FrozenMonoTrack:
+    return FrozenMonoTrack(MonoTrack.from_iter(multi_sine([220, 275, 330, 440], dur_s)))
+
+def rendered(track: MonoTrack) -> Callable[[], object]:
+    return lambda: FrozenMonoTrack(track, track.sample_rate)
+
+
+def synth_workloads(dur_s: float) -> list[Workload]:
+    partials = [110 * i for i in range(1, 9)]
+    return [
+        Workload("sine", dur_s, lambda: rendered(MonoTrack.from_iter(sine(440, dur_s)))),
+        Workload("multi_sine", dur_s, lambda: rendered(MonoTrack.from_iter(multi_sine(partials, dur_s)))),
+        Workload("wave", dur_s, lambda: rendered(MonoTrack.from_factory(partial(wave, SAWTOOTH_WAVE, 220, dur_s)))),
+        Workload("evolving_frequency", dur_s, lambda: rendered(MonoTrack.from_factory(
+            partial(evolving_frequency, lambda t: 440 + 110*sin(tau*t), dur_s)
+        ))),
+        Workload("evolving_frequency_vectorized", dur_s, lambda: rendered(MonoTrack.from_iter(
+            evolving_frequency(lambda t: 440 + 110*np.sin(tau*t), dur_s, vectorized=True)
+        ))),
+    ]
+
+
+def mix_track(dur_s: float, voice_n: int = 64) -> MonoTrack:
+    """`voice_n` enveloped notes of a second each, spread over `dur_s` seconds"""
+    note_dur = 1.0
+    track = MonoTrack.from_list([0.0] * int(dur_s * SAMPLE_RATE))
+    for i in range(voice_n):
+        voice = MonoTrack.from_iter(sine(110 * 2**(i % 24 / 12), note_dur, vol=1/16))
+        voice.adsr(0.01, 0.1, 0.6, 0.2, hit_time=note_dur - 0.2)
+        track.add(voice, offset_t=i * (dur_s - note_dur) / voice_n)
+    return track
+
+def mix_workloads(dur_s: float) -> list[Workload]:
+    def prepare():
+        track = mix_track(dur_s)
+        return track.to_audio
+    return [Workload("addition_64_adsr", dur_s, prepare)]
+
+
+def wav_workloads(minutes: list[float], dirname: str) -> list[Workload]:
+    def filename(m: float) -> str:
+        return os.path.join(dirname, f"noise_{m}min.wav")
+
+    def prepare_write(m: float):
+        data = noise_audio(m)
+        return lambda: write_wav_data(filename(m), data)
+
+    def prepare_read(m: float):
+        if not os.path.exists(filename(m)):
+            write_wav_data(filename(m), noise_audio(m))
+        return lambda: read_wav_data(filename(m))
+
+    workloads = []
+    for m in minutes:
+        workloads.append(Workload(f"write_wav_data_{m}min", 60 * m, partial(prepare_write, m)))
+        workloads.append(Workload(f"read_wav_data_{m}min", 60 * m, partial(prepare_read, m)))
+    return workloads
+
+
+def analysis_workloads(dur_s: float) -> list[Workload]:
+    def prepare_fft():
+        snippet = chord_snippet(dur_s)
+        return lambda: fft_full(snippet)
+
+    def prepare_stft():
+        snippet = chord_snippet(dur_s)
+        tps = 15
+        freq_resolution = 1
+
+        def run():
+            spectrum_raw = (
+                rescale_values([abs(v)*freq_resolution for v in fv], lo=0, hi=1)
+                for fv in fft_shorttime(snippet, times_per_sec=tps, freq_resolution=freq_resolution)
+            )
+            spectrum_filtered = (peak_iter(fv, lo_threshold=0.02) for fv in spectrum_raw)
+            return display_stft(spectrum_filtered, int(snippet.dur * tps), wh=(1000, 700), show=False)
+        return run
+
+    def prepare_amplitudes():
+        data = noise_audio(dur_s / 60)
+        return lambda: display_amplitudes_img(data, show=False)
+
+    return [
+        Workload("fft_full", dur_s, prepare_fft),
+        Workload("fft_shorttime_display_stft", dur_s, prepare_stft),
+        Workload("display_amplitudes_img", dur_s, prepare_amplitudes),
+    ]
+
+
+# ==================
+def measure(workload: Workload, *, repeat: int, memory: bool) -> Result:
+    """the render memo is cleared before every run, so no run profits from an earlier one"""
+    # the modules print some diagnostics, which would only disturb the timing
+    with redirect_stdout(StringIO()):
+        run = workload.prepare()
+        times = []
+        for _ in range(repeat):
+            RENDER_MEMO.clear()
+            gc.collect()
+            start = perf_counter()
+            run()
+            times.append(perf_counter() - start)
+
+        peak_mem = None
+        if memory:
+            RENDER_MEMO.clear()
+            gc.collect()
+            tracemalloc.start()
+            try:
+                run()
+                peak_mem = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+    return Result(workload.name, workload.audio_s, min(times), peak_mem)
+
+
+def git_commit() -> str | None:
+    """the HEAD commit, with "-dirty" if tracked files were changed"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"]).returncode != 0
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + "-dirty" if dirty else commit
+
+def environment() -> dict:
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def format_result(result: Result) -> str:
+    mem = "-" if result.peak_mem is None else f"{result.peak_mem / 2**20:10.1f} MiB"
+    return f"{result.name:<32} {1000*result.wall_time:10.1f} ms {result.realtime_factor:10.1f}x realtime {mem:>14}"
+
+def compare(old: dict, new: dict, *, threshold: float) -> list[str]:
+    """prints old and new side by side, returns the names of the regressed workloads\n
+    regressed: realtime factor or peak memory more than `threshold` (relative) worse"""
+    if old["config"] != new["config"]:
+        print(f"warning: different configurations {old['config']} vs. {new['config']}")
+    print(f"{old['environment']['commit']} -> {new['environment']['commit']}")
+    old_results = {res["name"]: res for res in old["results"]}
+    regressed = []
+    for res in new["results"]:
+        prev = old_results.get(res["name"])
+        if prev is None:
+            continue
+        speed = res["realtime_factor"] / prev["realtime_factor"] if prev["realtime_factor"] else 1
+        line = f"{res['name']:<32} {prev['realtime_factor']:10.1f}x -> {res['realtime_factor']:10.1f}x ({speed:5.2f})"
+        worse = speed < 1 - threshold
+        if res["peak_mem"] is not None and prev["peak_mem"]:
+            mem = res["peak_mem"] / prev["peak_mem"]
+            line += f" {prev['peak_mem'] / 2**20:8.1f} -> {res['peak_mem'] / 2**20:8.1f} MiB ({mem:5.2f})"
+            # small allocations vary a bit from run to run
+            worse |= mem > 1 + threshold and res["peak_mem"] - prev["peak_mem"] > 1 << 20
+        if worse:
+            regressed.append(res["name"])
+            line += "  REGRESSION"
+        print(line)
+    return regressed
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = ArgumentParser(description="realtime factor and peak memory of the hot paths")
+    parser.add_argument("--dur", type=float, default=10, help="seconds of audio for the synthesis, mixing and analysis workloads")
+    parser.add_argument("--wav-minutes", type=float, nargs="*", default=[1, 10, 60], help="file lengths for the WAV I/O workloads")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per workload, the fastest counts")
+    parser.add_argument("--only", nargs="*", default=None, help="only the workloads whose names contain one of these")
+    parser.add_argument("--no-memory", action="store_true", help="skip the (slower) tracemalloc runs")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown / growth that counts as a regression")
+    args = parser.parse_args(argv)
+
+    config = {"dur": args.dur, "wav_minutes": args.wav_minutes, "repeat": args.repeat}
+    results = []
+    with TemporaryDirectory() as dirname:
+        workloads = [
+            *synth_workloads(args.dur),
+            *mix_workloads(args.dur),
+            *wav_workloads(args.wav_minutes, dirname),
+            *analysis_workloads(args.dur)
+        ]
+        for workload in workloads:
+            if args.only is not None and not any(part in workload.name for part in args.only):
+                continue
+            result = measure(workload, repeat=args.repeat, memory=not args.no_memory)
+            print(format_result(result))
+            results.append(result)
+
+    report = {"environment": environment(), "config": config, "results": [res.to_dict() for res in results]}
+    if args.out is not None:
+        with open(args.out, "w") as file:
+            json.dump(report, file, indent=2)
+    if args.compare is not None:
+        with open(args.compare) as file:
+            regressed = compare(json.load(file), report, threshold=args.threshold)
+        if regressed:
+            print(f"{len(regressed)} regression(s): {', '.join(regressed)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
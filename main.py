@@ -1,7 +1,9 @@
 
-from math import cos, log10, pi, sin, tau
+from math import cos, log10, pi
 
-from modules.helpers import forward_function
+import numpy as np
+
+from modules.helpers import piecewise_function
 from modules.sound_generator import (
     Note,
     evolving_frequency,
@@ -15,22 +17,23 @@ from modules.sound_generator import (
     SQUARE_WAVE,
     TRIANG_WAVE
 )
+from modules.sequencer import Sequencer, chord, enveloped
 from modules.track import FrozenMonoTrack, MonoTrack, PolyTrack
 from modules.wav_rw import AudioData, read_wav_data, write_wav_data
 from modules.imager import display_amplitudes_img
 
 def main_timely():
-    fun = forward_function(
+    fun = piecewise_function(
         [
             lambda x: x**0.5 * (1-x),
-            lambda x: 1/pi * sin(pi*x),
+            lambda x: 1/pi * np.sin(pi*x),
             lambda x: x - 2,
-            lambda x: -sin(6*pi*x)/(6*pi) - (x-7/2)**2 / 6 + 3/2,
+            lambda x: -np.sin(6*pi*x)/(6*pi) - (x-7/2)**2 / 6 + 3/2,
             lambda x: 0 
         ],
         [1, 2, 7/2, 13/2]
     )
-    vfun = forward_function(
+    vfun = piecewise_function(
         [
             lambda x: 1,
             lambda x: 1-(x-2)/2,
@@ -41,8 +44,8 @@ def main_timely():
         [2, 3, 5, 6]
     )
     f_fun = lambda t: 300*fun(t) + 200
-    freq_it = evolving_frequency(f_fun, 7.5)
-    upidupi_track = MonoTrack.from_iter(freq_it).mul(0.8).mul_func(vfun)
+    freq_it = evolving_frequency(f_fun, 7.5, vectorized=True)
+    upidupi_track = MonoTrack.from_iter(freq_it).mul(0.8).mul_func(vfun, vectorized=True)
 
     new_audio = upidupi_track.to_audio()
     write_wav_data("neu_chilly.wav", new_audio)
@@ -65,6 +68,16 @@ def main_progression():
     audio = chord_prog.to_audio()
     write_wav_data("generated/chord.wav", audio)
 
+def main_sequence():
+    """the progression of `main_progression`, 8 times, every chord is only synthesized once"""
+    seq = Sequencer({"soft": enveloped(a=0.1, d=0.7, s=0.3, r=0.5)})
+    for bar in range(8):
+        for i, notes in enumerate(["c e g", "g h e5", "a c e", "f a c5"]):
+            seq.add(*chord(notes, 7.2*bar + 1.8*i, 1.8, velocity=0.25, instrument="soft"))
+
+    audio = seq.to_audio()
+    write_wav_data("generated/sequence.wav", audio)
+
 def main_flute():
     # base = 2**(1/3)
     db = lambda decibels: 10**(decibels/20)
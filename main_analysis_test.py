@@ -53,7 +53,7 @@ def main_stft():
     
     tps = 15
     freq_resolution = 1
-    dur = 1/freq_resolution * 24000/snippet.sample_rate
+    dur = 1/freq_resolution
 
 
     spectrum_raw = (
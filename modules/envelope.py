@@ -0,0 +1,136 @@
+
+"""Envelopes: gain as a function of time (in seconds)\n
+they work on single times as well as on arrays of times (a whole block at once),
+in any order (`MonoTrack.mul_func` and `MonoTrack.adsr` take them directly)\n
+single times go through plain float arithmetic (`gain`), numpy only pays off for blocks (`gains`)"""
+
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from dataclasses import astuple, dataclass
+from math import expm1
+
+import numpy as np
+
+
+class Envelope(ABC):
+    def __call__(self, t: float | np.ndarray) -> float | np.ndarray:
+        if isinstance(t, np.ndarray) and t.ndim > 0:
+            return self.gains(t.astype(np.float64, copy=False))
+        return self.gain(float(t))
+
+    @abstractmethod
+    def gain(self, t: float) -> float:
+        ...
+
+    @abstractmethod
+    def gains(self, times: np.ndarray) -> np.ndarray:
+        ...
+
+    @abstractmethod
+    def peak(self) -> float:
+        """an upper bound of |gain| (the graph optimizer drops clamps with it, see `track.optimize_graph`)"""
+        ...
+
+    def key(self) -> tuple:
+        """the parameters, equal for equal envelopes (see `track.structural_key`)"""
+        return (self.__class__.__name__, *astuple(self))
+
+
+@dataclass(frozen=True)
+class ADSR(Envelope):
+    """attack `a`, decay `d` (to the sustain level `s`), release `r` (starting at `hit_time`)"""
+    a: float
+    d: float
+    s: float
+    r: float
+    hit_time: float
+
+    def gain(self, t: float) -> float:
+        a, d, s, r, hit_time = self.a, self.d, self.s, self.r, self.hit_time
+        if t < a:
+            return t/a
+        if t < a+d:
+            return 1 - (t-a)/d * (1-s)
+        if t < hit_time:
+            return s
+        if t < hit_time + r:
+            return (1 - (t-hit_time)/r) * s
+        return 0.0
+
+    def peak(self) -> float:
+        return max(1, abs(self.s))
+
+    def gains(self, times: np.ndarray) -> np.ndarray:
+        a, d, s, r, hit_time = self.a, self.d, self.s, self.r, self.hit_time
+        # branches of zero length are never selected
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.select(
+                [times < a, times < a+d, times < hit_time, times < hit_time + r],
+                [times/a, 1 - (times-a)/d * (1-s), np.full_like(times, s), (1 - (times-hit_time)/r) * s],
+                0
+            )
+
+
+@dataclass(frozen=True)
+class Breakpoints(Envelope):
+    """Goes through the points (times[i], values[i]), constant before the first and after the last one\n
+    curves[i]: shape of the segment after point i (missing ones are 0),
+    0 is linear, otherwise exponential (> 0: slow at first, < 0: fast at first)"""
+    times: tuple[float, ...]
+    values: tuple[float, ...]
+    curves: tuple[float, ...] = ()
+
+    def __post_init__(self):
+        assert len(self.times) == len(self.values) > 0
+        assert all(t0 <= t1 for t0, t1 in zip(self.times, self.times[1:])), "times have to be ascending"
+        object.__setattr__(self, "times", tuple(self.times))
+        object.__setattr__(self, "values", tuple(self.values))
+        curves = tuple(self.curves) + (0,) * (len(self.times) - 1 - len(self.curves))
+        object.__setattr__(self, "curves", curves)
+
+    @classmethod
+    def linear(cls, points: list[tuple[float, float]]) -> "Breakpoints":
+        """points: (time, value) pairs"""
+        times, values = zip(*points)
+        return cls(times, values)
+
+    @classmethod
+    def exponential(cls, points: list[tuple[float, float]], curve: float = -4) -> "Breakpoints":
+        """points: (time, value) pairs, every segment with the same curve"""
+        times, values = zip(*points)
+        return cls(times, values, (curve,) * (len(points) - 1))
+
+    def gain(self, t: float) -> float:
+        times, values = self.times, self.values
+        if len(times) == 1:
+            return float(values[0])
+        i = min(max(bisect_right(times, t) - 1, 0), len(times) - 2)
+        seg_len = times[i+1] - times[i]
+        x = min(max((t - times[i]) / seg_len, 0), 1) if seg_len > 0 else 1
+        curve = self.curves[i]
+        shaped = x if curve == 0 else expm1(curve * x) / expm1(curve)
+        return values[i] + (values[i+1] - values[i]) * shaped
+
+    def peak(self) -> float:
+        # the curves stay between the values of their points
+        return max(abs(value) for value in self.values)
+
+    def gains(self, times: np.ndarray) -> np.ndarray:
+        if len(self.times) == 1:
+            return np.full_like(times, self.values[0])
+        points = np.array(self.times)
+        values = np.array(self.values)
+        curves = np.array(self.curves, dtype=np.float64)
+
+        # segment i goes from point i to i+1
+        i = np.clip(np.searchsorted(points, times, side="right") - 1, 0, len(points) - 2)
+        seg_len = points[i+1] - points[i]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x = np.where(seg_len > 0, (times - points[i]) / seg_len, 1)
+        x = np.clip(x, 0, 1)
+
+        curve = curves[i]
+        linear = curve == 0
+        curve = np.where(linear, 1, curve)
+        shaped = np.where(linear, x, np.expm1(curve * x) / np.expm1(curve))
+        return values[i] + (values[i+1] - values[i]) * shaped
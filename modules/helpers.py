@@ -1,7 +1,9 @@
 
+from bisect import bisect_left
 from itertools import islice
 from typing import Callable, Iterator
 
+import numpy as np
 
 def clamp(x: int, a: int, b: int) -> int:
     if x < a:
@@ -10,15 +12,22 @@ def clamp(x: int, a: int, b: int) -> int:
         return b
     return x
 
-def interval_to_int(x: float) -> int:
+def interval_to_int(x: float, bit_p_sample: int = 16) -> int:
     assert -1 <= x <= 1
     # if x < -1 or 1 < x:
     #     raise ValueError(f"{x=}")
-    r = int(x * (1 << 15))
-    return clamp(r, -(1 << 15), (1 << 15)-1)
-
-def int_to_interval(x: int) -> float:
-    ret = x / (1<<15)
+    half = 1 << (bit_p_sample - 1)
+    r = int(x * half)
+    return clamp(r, -half, half-1)
+
+def intervals_to_ints(xs: np.ndarray, bit_p_sample: int = 16) -> np.ndarray:
+    """vectorized `interval_to_int`"""
+    half = 1 << (bit_p_sample - 1)
+    r = (np.asarray(xs, dtype=np.float64) * half).astype(np.int64)
+    return np.clip(r, -half, half-1)
+
+def int_to_interval(x: int, bit_p_sample: int = 16) -> float:
+    ret = x / (1 << (bit_p_sample - 1))
     # print(ret)
     assert -1 <= ret <= 1
     return ret
@@ -106,4 +115,24 @@ def forward_function(funcs: list[FFFunc], borders: list[float]) -> FFFunc:
             current_border = borders.pop(0)
             end = len(borders) == 0
         return current_fun(t)
-    return fun
\ No newline at end of file
+    return fun
+
+def piecewise_function(funcs: list[FFFunc], borders: list[float]) -> FFFunc:
+    """Like `forward_function`, but it can be sampled in any order:\n
+    funcs[i] applies up to borders[i] (inclusive), the last one after the last border\n
+    takes an array of positions too (if the funcs do), evaluating each func once on its positions"""
+    assert len(funcs) == len(borders) + 1
+    funcs = list(funcs)
+    borders = list(borders)
+    def fun(t):
+        if np.ndim(t) == 0:
+            return funcs[bisect_left(borders, t)](t)
+        t = np.asarray(t, dtype=np.float64)
+        indices = np.searchsorted(borders, t, side="left")
+        ret = np.empty_like(t)
+        for i, func in enumerate(funcs):
+            mask = indices == i
+            if mask.any():
+                ret[mask] = func(t[mask])
+        return ret
+    return fun
@@ -6,7 +6,7 @@ from PIL import Image, ImageDraw
 
 from modules.helpers import clamp, windowed
 
-from .wav_rw import AudioData
+from .wav_rw import AudioData, samples_to_intervals
 
 def every_n(it: Iterator, n: int) -> Iterator:
     for i, el in enumerate(it):
@@ -17,34 +17,38 @@ def every_n(it: Iterator, n: int) -> Iterator:
 def mirror(x, y, h) -> tuple[int, int, int]:
     return (x, h-y)
 
-def display_amplitudes_img(audio_data: AudioData):
+def display_amplitudes_img(audio_data: AudioData, *, show: bool = True) -> Image.Image:
+    """show: open the image in a viewer (else it is only returned)"""
     chosing_n = 6000
-    chosing_rate = audio_data.bloc_n//chosing_n
+    chosing_rate = max(audio_data.bloc_n//chosing_n, 1)
     height = 200
 
-    max_possible = 1 << (audio_data.byte_p_sample * 8) >> 1
-
     img = Image.new("1", (chosing_n, 4*height))
 
-    samples_chosen = islice(every_n(audio_data.blocs, chosing_rate), chosing_n)
+    # strided view: only the chosen blocs are read (and converted)
+    samples_chosen = audio_data.samples[::chosing_rate][:chosing_n]
+    vols_chosen = samples_to_intervals(samples_chosen, audio_data.byte_p_sample, audio_data.audio_fmt)
+    right_index = min(1, audio_data.channels-1)
 
-    for i, bloc in enumerate(samples_chosen):
-        l, r = bloc
-        vol = int(l / max_possible * height)
+    for i, bloc in enumerate(vols_chosen):
+        l, r = bloc[0], bloc[right_index]
+        vol = int(l * height)
         offset = height - abs(vol)  # if vol >= 0 else height
 
         for y in range(2*abs(vol)):
             img.putpixel((i, offset+y), 1)
 
-        vol = int(r / max_possible * height)
+        vol = int(r * height)
         offset = height - abs(vol)  # if vol >= 0 else height
 
         for y in range(2*abs(vol)):
             img.putpixel((i, 2*height+offset+y), 1)
 
-    img.show()
+    if show:
+        img.show()
+    return img
 
-def display_fft_res(fft_res: list[complex], *, wh=(500, 300)):
+def display_fft_res(fft_res: list[complex], *, wh=(500, 300), show: bool = True) -> Image.Image:
     w, h = wh
     baseline = 20
     topline = h-20
@@ -69,7 +73,9 @@ def display_fft_res(fft_res: list[complex], *, wh=(500, 300)):
         
         img.putpixel(mirror(leftline+i, baseline-5, h), 1)
 
-    img.show()
+    if show:
+        img.show()
+    return img
 
 def stepped_range(start: float, stop: float, step: float) -> Iterator[int]:
     """yields integers"""
@@ -105,8 +111,9 @@ def spectrum_column(
 
 FFT_ITER = Iterator[list[tuple[float, float]]]
 
-def display_stft(fft_t: FFT_ITER, sample_n: int, wh=(500, 300)):
-    """length: number of values to display"""
+def display_stft(fft_t: FFT_ITER, sample_n: int, wh=(500, 300), *, show: bool = True) -> Image.Image:
+    """length: number of values to display\n
+    show: open the image in a viewer (else it is only returned)"""
     w, h = wh
     baseline = 20
     topline = h-20
@@ -128,7 +135,9 @@ def display_stft(fft_t: FFT_ITER, sample_n: int, wh=(500, 300)):
             val = clamp(val, 0, 1)
             shape = [(leftline + x_start, i), (leftline+x_end-1, i+1)]
             drawer.rectangle(shape, int(val*255))
-            
-    img.show()
+
+    if show:
+        img.show()
+    return img
 
     
@@ -0,0 +1,169 @@
+
+"""Rendering on several processes: the parts of an Addition, or the time segments of a single track\n
+the workers are forked, so they inherit the track graph (lambdas and closures included)
+and the shared memory they render into"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from mmap import mmap
+from multiprocessing import get_all_start_methods, get_context
+from os import cpu_count
+
+import numpy as np
+
+from .track import BLOCK_SIZE, Addition, FromList, Parts, blocks_from, length_of, memo_blocks, structural_key, take_samples
+
+# (addition, groups of part indices, span start per group, shared buffer per group),
+# set before the workers are forked
+_job = None
+# (node, segments, shared buffer of the whole output), the same for `render_sliced`
+_slice_job = None
+
+
+def partition(weights: list[int], n: int) -> list[range]:
+    """splits the indices of `weights` into at most `n` contiguous ranges of about equal weight"""
+    target = sum(weights) / n
+    ranges = []
+    start = 0
+    acc = 0
+    for i, weight in enumerate(weights):
+        acc += weight
+        if acc >= target * (len(ranges) + 1) and len(ranges) < n - 1:
+            ranges.append(range(start, i + 1))
+            start = i + 1
+    if start < len(weights):
+        ranges.append(range(start, len(weights)))
+    return ranges
+
+
+def _render_group(group_index: int, block_size: int):
+    addition, groups, span_starts, buffers = _job
+    out = np.frombuffer(buffers[group_index], np.float64)
+    for i in groups[group_index]:
+        pos = addition.offsets[i] - span_starts[group_index]
+        for block in memo_blocks(addition.parts[i], 0, block_size):
+            out[pos: pos + len(block)] += block
+            pos += len(block)
+
+
+def render_addition(addition: Addition, *, workers: int | None = None, block_size: int = BLOCK_SIZE) -> np.ndarray:
+    """Mixes the parts of `addition` on `workers` processes (default: one per core)\n
+    the parts are sorted by their offsets and split into contiguous groups,
+    each group is mixed into its own shared buffer, which are summed up in group order
+    (so the result doesn't depend on which worker finishes first)"""
+    global _job
+    workers = workers or cpu_count() or 1
+    lengths = [length_of(part) for part in addition.parts]
+    if None in lengths:
+        raise ValueError("Parallel mixing needs parts of known length!")
+    out = np.zeros(addition.length())
+
+    order = sorted(range(len(addition.parts)), key=lambda i: (addition.offsets[i], i))
+    # a few more groups than workers, so that the load evens out
+    index_ranges = partition([lengths[i] for i in order], 2 * workers)
+    groups = [[order[j] for j in index_range] for index_range in index_ranges]
+    span_starts = [min(addition.offsets[i] for i in group) for group in groups]
+    span_stops = [max(addition.offsets[i] + lengths[i] for i in group) for group in groups]
+    # anonymous shared mappings, inherited by the forked workers (at least 1 byte each)
+    buffers = [mmap(-1, max(8 * (stop - start), 1)) for start, stop in zip(span_starts, span_stops)]
+
+    _job = (addition, groups, span_starts, buffers)
+    try:
+        with ProcessPoolExecutor(workers, mp_context=get_context("fork")) as executor:
+            futures = [executor.submit(_render_group, i, block_size) for i in range(len(groups))]
+            for future in futures:
+                future.result()
+        for start, stop, buffer in zip(span_starts, span_stops, buffers):
+            out[start: stop] += np.frombuffer(buffer, np.float64, stop - start)
+    finally:
+        _job = None
+        for buffer in buffers:
+            buffer.close()
+    return out
+
+
+def can_render_parallel(node) -> bool:
+    return "fork" in get_all_start_methods() and _find_addition(node) is not None
+
+
+def _find_addition(node) -> Addition | None:
+    """the Addition at the top of the graph, below single-track nodes (gains, Dur, Resample)"""
+    while not isinstance(node, Addition):
+        if isinstance(node, Parts) and len(node.parts) == 1:
+            node = node.parts[0]
+        elif hasattr(node, "track"):
+            node = node.track
+        elif hasattr(node, "obj"):
+            node = node.obj
+        else:
+            return None
+    return node if length_of(node) is not None else None
+
+
+def parallel_graph(node, *, workers: int | None = None, block_size: int = BLOCK_SIZE):
+    """the graph with its top Addition rendered in parallel and replaced by the result"""
+    if isinstance(node, Addition):
+        return FromList(render_addition(node, workers=workers, block_size=block_size))
+    if isinstance(node, Parts):
+        return Parts([parallel_graph(node.parts[0], workers=workers, block_size=block_size)])
+    if hasattr(node, "obj"):
+        return parallel_graph(node.obj, workers=workers, block_size=block_size)
+    return replace(node, track=parallel_graph(node.track, workers=workers, block_size=block_size))
+
+
+# ==================
+def time_segments(length: int, n: int, block_size: int = BLOCK_SIZE) -> list[range]:
+    """splits `[0, length)` into at most `n` segments of about equal length,
+    starting on multiples of block_size (so that their blocks line up with those of a serial render)"""
+    step = max(-(-length // n), 1)
+    step = -(-step // block_size) * block_size
+    return [range(start, min(start + step, length)) for start in range(0, length, step)]
+
+
+def _render_segment(index: int, block_size: int):
+    node, segments, buffer = _slice_job
+    segment = segments[index]
+    out = np.frombuffer(buffer, np.float64, len(segment), 8 * segment.start)
+    pos = 0
+    for block in take_samples(blocks_from(node, segment.start, block_size), len(segment)):
+        out[pos: pos + len(block)] = block
+        pos += len(block)
+
+
+def render_sliced(node, *, workers: int | None = None, block_size: int = BLOCK_SIZE) -> np.ndarray:
+    """Renders `node` on `workers` processes (default: one per core), each one a segment of the time:\n
+    every segment seeks to its start (see `track.blocks_from`), so the waves start with the right phase
+    and the envelopes at the right position, the workers write into one shared output buffer\n
+    (closed form waves seek in O(1), integrated ones like `evolving_frequency` integrate up to the start)\n
+    the result equals a serial render within floating-point tolerance, not bit for bit:
+    the state at a segment start is computed directly, which rounds a little differently
+    (up to about 1e-11 for the integrated waves)"""
+    global _slice_job
+    workers = workers or cpu_count() or 1
+    length = length_of(node)
+    if length is None:
+        raise ValueError("Time slicing needs a track of known length!")
+    segments = time_segments(length, workers, block_size)
+    buffer = mmap(-1, max(8 * length, 1))
+
+    _slice_job = (node, segments, buffer)
+    try:
+        with ProcessPoolExecutor(workers, mp_context=get_context("fork")) as executor:
+            futures = [executor.submit(_render_segment, i, block_size) for i in range(len(segments))]
+            for future in futures:
+                future.result()
+        out = np.frombuffer(buffer, np.float64, length).copy()
+    finally:
+        _slice_job = None
+        buffer.close()
+    return out
+
+
+def can_render_sliced(node) -> bool:
+    """the length has to be known, and every source has to start over for each segment
+    (one-shot iterators can't be keyed, see `track.structural_key`)"""
+    return (
+        "fork" in get_all_start_methods()
+        and length_of(node) is not None
+        and structural_key(node) is not None
+    )
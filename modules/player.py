@@ -0,0 +1,206 @@
+
+"""Streaming playback: a background thread renders fixed-size buffers
+into a bounded queue, the playing thread hands them to a sink"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from itertools import islice
+from queue import Empty, Queue
+from threading import Event, Thread
+from time import perf_counter, sleep
+from typing import Iterator
+
+import numpy as np
+
+from .wav_rw import WAVE_FORMAT_PCM, WavStreamWriter, intervals_to_samples
+
+
+class Sink(ABC):
+    """Where the played buffers end up"""
+    def open(self, channels: int, sample_rate: int):
+        self.channels = channels
+        self.sample_rate = sample_rate
+
+    @abstractmethod
+    def write(self, buffer: np.ndarray):
+        """buffer: floats in [-1, 1] of shape (n, channels)"""
+        ...
+
+    def close(self):
+        pass
+
+
+class NullSink(Sink):
+    """Throws the buffers away, for measuring throughput\n
+    realtime: take as long as a sound card would to play each buffer"""
+    def __init__(self, *, realtime: bool = False) -> None:
+        self.realtime = realtime
+        self.bloc_n = 0
+
+    def write(self, buffer: np.ndarray):
+        self.bloc_n += len(buffer)
+        if self.realtime:
+            sleep(len(buffer) / self.sample_rate)
+
+
+class FileSink(Sink):
+    """Writes the buffers into a WAV file"""
+    def __init__(self, filename: str, *, bit_p_sample: int = 16, audio_fmt: int = WAVE_FORMAT_PCM) -> None:
+        self.filename = filename
+        self.bit_p_sample = bit_p_sample
+        self.audio_fmt = audio_fmt
+        self._stream = None
+
+    def open(self, channels: int, sample_rate: int):
+        super().open(channels, sample_rate)
+        self._stream = WavStreamWriter(
+            self.filename,
+            channels=channels,
+            sample_rate=sample_rate,
+            bit_p_sample=self.bit_p_sample,
+            audio_fmt=self.audio_fmt
+        ).__enter__()
+
+    def write(self, buffer: np.ndarray):
+        byte_p_sample = (self.bit_p_sample + 7) >> 3
+        self._stream.write_samples(intervals_to_samples(buffer, byte_p_sample, self.audio_fmt))
+
+    def close(self):
+        self._stream.__exit__(None, None, None)
+
+
+class PyAudioSink(Sink):
+    """Plays the buffers on the default output device (as 32 bit floats)"""
+    def open(self, channels: int, sample_rate: int):
+        # imported here, so that headless sinks work without PyAudio
+        import pyaudio
+
+        super().open(channels, sample_rate)
+        self._pya = pyaudio.PyAudio()
+        self._stream = self._pya.open(
+            format=pyaudio.paFloat32,
+            channels=channels,
+            rate=sample_rate,
+            output=True
+        )
+
+    def write(self, buffer: np.ndarray):
+        self._stream.write(buffer.astype(np.float32).tobytes())
+
+    def close(self):
+        self._stream.stop_stream()
+        self._stream.close()
+        self._pya.terminate()
+
+
+@dataclass
+class PlaybackStats:
+    buffers:    int = 0
+    bloc_n:     int = 0
+    # times the sink had to wait because the queue ran empty
+    underruns:  int = 0
+    # seconds until the first buffer reached the sink
+    first_buffer_latency: float = 0
+    wall_time:  float = 0
+    sample_rate: int = 48000
+
+    @property
+    def realtime_factor(self) -> float:
+        """seconds of audio played per second of wall time"""
+        return self.bloc_n / self.sample_rate / self.wall_time if self.wall_time else 0
+
+
+_END = None
+
+
+class StreamPlayer:
+    """buffer_size: blocs per buffer\n
+    queue_size: buffers rendered ahead, i.e. the latency is `buffer_size * queue_size` blocs"""
+    def __init__(
+            self,
+            sink: Sink, *,
+            channels: int = 1,
+            sample_rate: int = 48000,
+            buffer_size: int = 1024,
+            queue_size: int = 4
+        ) -> None:
+        self.sink = sink
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.buffer_size = buffer_size
+        self.queue_size = queue_size
+
+    @property
+    def latency(self) -> float:
+        """in seconds"""
+        return self.buffer_size * self.queue_size / self.sample_rate
+
+    def _produce(self, buffers: Iterator[np.ndarray], queue: Queue, stop: Event):
+        """stop: set when playing ended early (e.g. the sink failed), the queue is drained after it,
+        so the put after the last check can't block"""
+        try:
+            for buffer in buffers:
+                if stop.is_set():
+                    return
+                queue.put(buffer.reshape(-1, self.channels))
+        except Exception as exc:
+            if stop.is_set():
+                return
+            queue.put(exc)
+        if not stop.is_set():
+            queue.put(_END)
+
+    @staticmethod
+    def _drain(queue: Queue):
+        try:
+            while True:
+                queue.get_nowait()
+        except Empty:
+            pass
+
+    def play_buffers(self, buffers: Iterator[np.ndarray]) -> PlaybackStats:
+        """buffers: float arrays of shape (n, channels) (or flat for mono)"""
+        stats = PlaybackStats(sample_rate=self.sample_rate)
+        queue = Queue(self.queue_size)
+        stop = Event()
+        producer = Thread(target=self._produce, args=(buffers, queue, stop), daemon=True)
+
+        start = perf_counter()
+        self.sink.open(self.channels, self.sample_rate)
+        producer.start()
+        try:
+            while True:
+                try:
+                    buffer = queue.get_nowait()
+                except Empty:
+                    buffer = queue.get()
+                    # waiting for the first buffer is latency, waiting for the end is fine
+                    stats.underruns += stats.buffers > 0 and buffer is not _END
+                if buffer is _END:
+                    break
+                if isinstance(buffer, Exception):
+                    raise buffer
+                if not stats.buffers:
+                    stats.first_buffer_latency = perf_counter() - start
+                self.sink.write(buffer)
+                stats.buffers += 1
+                stats.bloc_n += len(buffer)
+        finally:
+            stop.set()
+            self._drain(queue)
+            producer.join()
+            self.sink.close()
+        stats.wall_time = perf_counter() - start
+        return stats
+
+    def play(self, samples: Iterator[float] | Iterator[tuple[float]]) -> PlaybackStats:
+        """samples: floats (mono) or tuples of floats (one per channel), e.g. a track"""
+        return self.play_buffers(self._buffered(iter(samples)))
+
+    def _buffered(self, it: Iterator) -> Iterator[np.ndarray]:
+        if self.channels == 1:
+            while len(buffer := np.fromiter(islice(it, self.buffer_size), np.float64)):
+                yield buffer
+            return
+        while chunk := list(islice(it, self.buffer_size)):
+            yield np.array(chunk, dtype=np.float64)
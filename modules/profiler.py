@@ -0,0 +1,182 @@
+
+"""Per-node profiling of the block engine\n
+while a Profiler is active, every node's blocks are timed (see `track.blocks_from`),
+the records form a tree like the track graph"""
+
+import json
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from os.path import basename
+from time import perf_counter
+from typing import Callable, Iterator, Self
+
+import numpy as np
+
+
+@dataclass
+class NodeProfile:
+    name:       str
+    # seconds spent producing the blocks, including the children
+    wall_time:  float = 0
+    sample_n:   int = 0
+    children:   list[Self] = field(default_factory=list)
+
+    @property
+    def self_time(self) -> float:
+        """seconds spent in the node itself"""
+        return self.wall_time - sum(child.wall_time for child in self.children)
+
+    @property
+    def samples_p_sec(self) -> float:
+        return self.sample_n / self.wall_time if self.wall_time else 0
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "wall_time": self.wall_time,
+            "self_time": self.self_time,
+            "sample_n": self.sample_n,
+            "samples_p_sec": self.samples_p_sec,
+            "children": [child.to_dict() for child in self.children]
+        }
+
+    def lines(self, depth: int = 0) -> Iterator[str]:
+        yield (
+            f"{'  '*depth}{self.name:<{40 - 2*depth}} {1000*self.wall_time:9.2f} ms"
+            f" {1000*self.self_time:9.2f} ms self {self.sample_n:>10} samples {self.samples_p_sec/1e6:8.2f} MS/s"
+        )
+        for child in self.children:
+            yield from child.lines(depth + 1)
+
+
+@dataclass
+class RenderProfile:
+    root:       NodeProfile
+    wall_time:  float = 0
+    sample_n:   int = 0
+    sample_rate: int = 48000
+
+    @property
+    def realtime_factor(self) -> float:
+        """seconds of audio rendered per second of wall time"""
+        return self.sample_n / self.sample_rate / self.wall_time if self.wall_time else 0
+
+    def to_dict(self) -> dict:
+        return {
+            "wall_time": self.wall_time,
+            "sample_n": self.sample_n,
+            "sample_rate": self.sample_rate,
+            "realtime_factor": self.realtime_factor,
+            "root": self.root.to_dict()
+        }
+
+    def to_json(self, filename: str | None = None) -> str:
+        """also writes it into `filename`, if given"""
+        text = json.dumps(self.to_dict(), indent=2)
+        if filename is not None:
+            with open(filename, "w") as file:
+                file.write(text)
+        return text
+
+    def __str__(self) -> str:
+        head = f"{self.sample_n} samples in {1000*self.wall_time:.2f} ms (realtime factor {self.realtime_factor:.1f})"
+        return "\n".join([head, *self.root.lines()])
+
+
+def fun_label(fun) -> str:
+    """name of a factor function, lambdas with where they were defined (`<lambda>@main.py:12`)"""
+    # KeyedFunction, partial
+    fun = getattr(fun, "fun", None) or getattr(fun, "func", None) or fun
+    code = getattr(fun, "__code__", None)
+    name = getattr(fun, "__qualname__", None) or type(fun).__name__
+    if code is not None and code.co_name == "<lambda>":
+        return f"{name}@{basename(code.co_filename)}:{code.co_firstlineno}"
+    return name
+
+
+def _gain_label(factor: float, factor_funs: list) -> str:
+    parts = [f"{factor:g}"] if factor != 1 or not factor_funs else []
+    return " * ".join(parts + [fun_label(fun) for fun, _ in factor_funs])
+
+
+def node_label(node) -> str:
+    """class name, with the source of generators and the name of factor functions
+    (a FusedGain with the ones of all its stages, see `track.optimize_graph`)"""
+    name = type(node).__name__
+    if hasattr(node, "factor_funs"):
+        label = _gain_label(node.factor, node.factor_funs)
+        if node.post_factor != 1 or node.post_funs:
+            label += ", post " + _gain_label(node.post_factor, node.post_funs)
+        return f"{name}[{label}]"
+    for attr in ("it", "factory"):
+        inner = getattr(node, attr, None)
+        if inner is not None:
+            inner_name = getattr(inner, "__name__", None) or type(inner).__name__
+            return f"{name}[{inner_name}]"
+    if getattr(node, "factor_fun", None) is not None:
+        return f"{name}[{fun_label(node.factor_fun)}]"
+    return name
+
+
+class Profiler:
+    """Records a NodeProfile per (parent, node), while it is `active`"""
+    active: "Profiler | None" = None
+
+    def __init__(self) -> None:
+        self.root = NodeProfile("render")
+        self._stack = [self.root]
+        self._records: dict[tuple[int, int], NodeProfile] = {}
+
+    def _record(self, node) -> NodeProfile:
+        parent = self._stack[-1]
+        key = (id(parent), id(node))
+        record = self._records.get(key)
+        if record is None:
+            record = self._records[key] = NodeProfile(node_label(node))
+            parent.children.append(record)
+        return record
+
+    def profiled(self, node, make_blocks: Callable[[], Iterator[np.ndarray]]) -> Iterator[np.ndarray]:
+        """the blocks of `node` from `make_blocks()`, timed"""
+        record = self._record(node)
+        # nodes that set up their children right away, find them under their own record
+        self._stack.append(record)
+        try:
+            blocks = iter(make_blocks())
+        finally:
+            self._stack.pop()
+        return self._timed(record, blocks)
+
+    def _timed(self, record: NodeProfile, blocks: Iterator[np.ndarray]) -> Iterator[np.ndarray]:
+        while True:
+            self._stack.append(record)
+            start = perf_counter()
+            try:
+                block = next(blocks, None)
+            finally:
+                record.wall_time += perf_counter() - start
+                self._stack.pop()
+            if block is None:
+                return
+            record.sample_n += len(block)
+            yield block
+
+
+@contextmanager
+def profiling(sample_rate: int = 48000) -> Iterator[RenderProfile]:
+    """Profiles the renders inside the with block:\n
+    `with profiling() as profile: track.save(...)`, the profile is complete after the block"""
+    profiler = Profiler()
+    profile = RenderProfile(profiler.root, sample_rate=sample_rate)
+    previous = Profiler.active
+    Profiler.active = profiler
+    start = perf_counter()
+    try:
+        yield profile
+    finally:
+        profile.wall_time = perf_counter() - start
+        Profiler.active = previous
+        # the samples that came out of the top nodes
+        profile.sample_n = sum(child.sample_n for child in profiler.root.children)
+        profiler.root.wall_time = sum(child.wall_time for child in profiler.root.children)
+        profiler.root.sample_n = profile.sample_n
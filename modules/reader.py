@@ -66,3 +66,13 @@ class Reader:
     def skip_n(self, n: int):
         assert self.file_obj
         self.file_obj.read(n)
+
+    def seek(self, offset: int):
+        """moves to an absolute byte offset"""
+        assert self.file_obj
+        self.file_obj.seek(offset)
+
+    def tell(self) -> int:
+        """current byte offset in the file"""
+        assert self.file_obj
+        return self.file_obj.tell()
@@ -0,0 +1,172 @@
+
+"""Content addressed cache of rendered tracks on disk:
+the sha256 of a track graph's parameters -> its samples as a .npy file"""
+
+from dataclasses import dataclass
+from hashlib import sha256
+from os import listdir, makedirs, remove, replace, stat, utime
+from os.path import join
+from types import CodeType
+
+import numpy as np
+
+from .track import BLOCK_SIZE, FrozenMonoTrack, MonoTrack, blocks_of, optimize_graph, structural_key
+from .wav_rw import WAVE_FORMAT_PCM, AudioData
+
+# bump when the rendering changes, so that old entries aren't used anymore
+# (2: the keys of functions include the values of the globals they read,
+#  3: and the code of the project functions and classes they call)
+CACHE_VERSION = 3
+
+
+class Unstable(Exception):
+    """a key part that isn't the same in another process (e.g. a lambda)"""
+
+
+def _stable(part) -> str:
+    if part is None or isinstance(part, (bool, str, bytes)):
+        return repr(part)
+    if isinstance(part, (int, np.integer)):
+        return repr(int(part))
+    if isinstance(part, (float, np.floating)):
+        return float(part).hex()
+    if isinstance(part, tuple):
+        return "(" + ",".join(map(_stable, part)) + ")"
+    if isinstance(part, CodeType):
+        if part.co_name == "<lambda>":
+            raise Unstable(part)
+        return f"code {part.co_qualname} {_code_digest(part)}"
+    # functions compared by identity, iterators, ...
+    raise Unstable(part)
+
+
+def _code_digest(code: CodeType) -> str:
+    """changes whenever the function is edited\n
+    (only the names of the globals it reads are in here, their values and the code of the
+    project functions and classes it calls are part of the function's key, see `track.function_key`)"""
+    consts = [_code_digest(const) if isinstance(const, CodeType) else repr(const) for const in code.co_consts]
+    return sha256(code.co_code + repr((consts, code.co_names)).encode()).hexdigest()
+
+
+def track_digest(track: MonoTrack) -> str | None:
+    """stable hash of the track graph (generators, frequencies, durations, envelopes, sample rate,
+    the code of the functions and of the project functions they call, the values of the module constants they read)\n
+    None if it depends on lambdas without `cache_key`, on one-shot iterators
+    or on functions reading globals that can't be compared by value"""
+    key = structural_key(track)
+    if key is None:
+        return None
+    try:
+        stable = _stable((CACHE_VERSION, track.sample_rate, key))
+    except Unstable:
+        return None
+    return sha256(stable.encode()).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits:       int = 0
+    misses:     int = 0
+    # renders of tracks without a stable key
+    bypasses:   int = 0
+    evictions:  int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0
+
+
+class RenderCache:
+    """dirname: cache directory, one `<digest>.npy` per track\n
+    max_bytes: beyond that the least recently used entries are deleted
+    (the modification time of an entry is its last use)"""
+    def __init__(self, dirname: str, *, max_bytes: int = 1 << 30) -> None:
+        self.dirname = dirname
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        makedirs(dirname, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return join(self.dirname, digest + ".npy")
+
+    def get(self, track: MonoTrack, *, digest: str | None = None) -> FrozenMonoTrack | None:
+        """the cached samples (memory-mapped), None if they aren't cached\n
+        digest: `track_digest(track)`, if it is known already (hashing walks the whole graph and its arrays)"""
+        digest = digest or track_digest(track)
+        if digest is None:
+            return None
+        try:
+            values = np.load(self._path(digest), mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        utime(self._path(digest))
+        return FrozenMonoTrack.from_list(values, track.sample_rate)
+
+    def put(self, track: MonoTrack, values: np.ndarray, *, digest: str | None = None):
+        """digest: like in `get`"""
+        digest = digest or track_digest(track)
+        if digest is None:
+            return
+        path = self._path(digest)
+        # written under another name first, so that a crash leaves no half entry
+        with open(path + ".tmp", "wb") as file:
+            np.save(file, np.asarray(values, dtype=np.float64))
+        replace(path + ".tmp", path)
+        self.evict()
+
+    def render(self, track: MonoTrack, *, block_size: int = BLOCK_SIZE) -> FrozenMonoTrack:
+        """the rendered track, from the cache if it is there (rendered and stored otherwise)"""
+        digest = track_digest(track)
+        if digest is None:
+            self.stats.bypasses += 1
+            return FrozenMonoTrack.from_list(self._rendered(track, block_size), track.sample_rate)
+        cached = self.get(track, digest=digest)
+        if cached is not None:
+            self.stats.hits += 1
+            return cached
+        self.stats.misses += 1
+        values = self._rendered(track, block_size)
+        # not read back, it may have been evicted right away (if it is bigger than max_bytes)
+        self.put(track, values, digest=digest)
+        return FrozenMonoTrack.from_list(values, track.sample_rate)
+
+    def _rendered(self, track: MonoTrack, block_size: int) -> np.ndarray:
+        graph, _ = optimize_graph(track.obj)
+        return np.concatenate([np.zeros(0), *blocks_of(graph, block_size)])
+
+    def to_audio(self, track: MonoTrack, *, bit_p_sample: int = 16, audio_fmt: int = WAVE_FORMAT_PCM) -> AudioData:
+        """`track.to_audio(...)`, through the cache"""
+        return self.render(track).to_audio(bit_p_sample=bit_p_sample, audio_fmt=audio_fmt)
+
+    # ==================
+    def entries(self) -> list[tuple[str, int, float]]:
+        """(path, size, last use) of every entry, least recently used first"""
+        paths = [join(self.dirname, name) for name in listdir(self.dirname) if name.endswith(".npy")]
+        entries = []
+        for path in paths:
+            try:
+                info = stat(path)
+            except OSError:
+                continue
+            entries.append((path, info.st_size, info.st_mtime))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    @property
+    def size(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """deletes least recently used entries until the cache fits into max_bytes"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            remove(path)
+            total -= size
+            self.stats.evictions += 1
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            remove(path)
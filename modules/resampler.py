@@ -0,0 +1,105 @@
+
+"""Polyphase windowed-sinc resampling, block by block"""
+
+from math import ceil, gcd
+from typing import Iterator
+
+import numpy as np
+from scipy.signal import firwin
+
+
+class Resampler:
+    """Converts from `from_rate` to `to_rate` (by the rational factor up/down)\n
+    the input can be fed in blocks of any size, the filter state is carried over\n
+    half_width: zero crossings of the sinc on each side (quality vs. speed)\n
+    beta: kaiser window parameter (stopband attenuation)"""
+    def __init__(self, from_rate: int, to_rate: int, *, half_width: int = 16, beta: float = 8.6) -> None:
+        divisor = gcd(from_rate, to_rate)
+        self.up = to_rate // divisor
+        self.down = from_rate // divisor
+
+        # prototype lowpass at the upsampled rate, cutting off at the lower nyquist frequency
+        factor = max(self.up, self.down)
+        tap_n = 2 * half_width * factor + 1
+        taps = firwin(tap_n, 0.95 / factor, window=("kaiser", beta)) * self.up
+
+        # poly[phase, t] = taps[phase + up*t]
+        self.taps_p_phase = ceil(tap_n / self.up)
+        padded = np.zeros(self.taps_p_phase * self.up)
+        padded[:tap_n] = taps
+        self.poly = padded.reshape(self.taps_p_phase, self.up).T
+        # group delay of the filter (at the upsampled rate), compensated for
+        self.delay = (tap_n - 1) // 2
+
+        # inputs that are still needed; _buf[0] is input number _buf_start
+        self._buf: np.ndarray | None = None
+        self._buf_start = -(self.taps_p_phase - 1)
+        self._in_n = 0
+        self._out_n = 0
+
+    def _outputs_until(self, out_stop: int) -> np.ndarray:
+        ns = np.arange(self._out_n, out_stop)
+        pos = ns * self.down + self.delay
+        base, phase = np.divmod(pos, self.up)
+        # indices into _buf of the inputs base, base-1, ..., base-taps_p_phase+1
+        idx = base[:, None] - np.arange(self.taps_p_phase)[None, :] - self._buf_start
+        coefs = self.poly[phase]
+
+        out = np.einsum("nt,nt...->n...", coefs, self._buf[idx])
+        self._out_n = out_stop
+
+        # forget the inputs no later output depends on
+        next_base = (out_stop * self.down + self.delay) // self.up
+        drop = max(next_base - (self.taps_p_phase - 1) - self._buf_start, 0)
+        self._buf = self._buf[drop:]
+        self._buf_start += drop
+        return out
+
+    def _append(self, block: np.ndarray):
+        if self._buf is None:
+            # zeros before the first input
+            self._buf = np.zeros((self.taps_p_phase - 1,) + block.shape[1:])
+        self._buf = np.concatenate([self._buf, block])
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """block: samples of shape (n,) or (n, channels)\n
+        returns all output samples that can already be computed"""
+        block = np.asarray(block, dtype=np.float64)
+        self._append(block)
+        self._in_n += len(block)
+        # an output needs its (delayed) base input to be known
+        out_stop = max(ceil((self._in_n * self.up - self.delay) / self.down), self._out_n)
+        return self._outputs_until(out_stop)
+
+    def flush(self) -> np.ndarray:
+        """returns the remaining output samples (the input is assumed to end here)"""
+        if self._buf is None:
+            return np.zeros(0)
+        out_total = ceil(self._in_n * self.up / self.down)
+        self._append(np.zeros((ceil((self.delay + self.down) / self.up) + 1,) + self._buf.shape[1:]))
+        return self._outputs_until(out_total)
+
+
+def resample_blocks(
+        blocks: Iterator[np.ndarray],
+        from_rate: int,
+        to_rate: int, *,
+        half_width: int = 16
+    ) -> Iterator[np.ndarray]:
+    """Resamples a stream of blocks, in constant memory"""
+    resampler = Resampler(from_rate, to_rate, half_width=half_width)
+    for block in blocks:
+        out = resampler.process(block)
+        if len(out):
+            yield out
+    out = resampler.flush()
+    if len(out):
+        yield out
+
+
+def resample(values: np.ndarray, from_rate: int, to_rate: int, *, half_width: int = 16) -> np.ndarray:
+    """values: samples of shape (n,) or (n, channels)"""
+    if from_rate == to_rate:
+        return np.asarray(values, dtype=np.float64)
+    resampler = Resampler(from_rate, to_rate, half_width=half_width)
+    return np.concatenate([resampler.process(values), resampler.flush()])
@@ -0,0 +1,144 @@
+
+"""Sequencer: a score of note events, mixed from a cache of rendered notes\n
+equal notes (pitch, duration, instrument) are synthesized once, every further occurrence
+only costs adding the buffer in at its offset"""
+
+from dataclasses import dataclass, field
+from heapq import heapify, heappop, heappush
+from typing import Callable, Iterator, Self
+
+import numpy as np
+
+from .sound_generator import Note, note_to_freq, sine, str_to_note
+from .track import FrozenMonoTrack, MonoTrack, RenderMemo
+from .wav_rw import WAVE_FORMAT_PCM, AudioData
+
+# (frequency, duration in seconds, sample rate) -> track of the note (may ring on after the duration)
+Instrument = Callable[[float, float, int], MonoTrack]
+
+# seconds a stolen voice fades out
+STEAL_FADE = 0.005
+
+
+def enveloped(
+        generator: Callable[..., Iterator[float]] = sine, *,
+        a: float = 0.01,
+        d: float = 0.1,
+        s: float = 0.7,
+        r: float = 0.2
+    ) -> Instrument:
+    """an instrument playing `generator(f, dur_s + r)` under an ADSR, released at the end of the note\n
+    generator: e.g. `sine`, `sawtooth` (anything taking a frequency, a duration and `sample_rate`)"""
+    def instrument(f: float, dur_s: float, sample_rate: int) -> MonoTrack:
+        track = MonoTrack.from_iter(generator(f, dur_s + r, sample_rate=sample_rate), sample_rate)
+        return track.adsr(a, d, s, r, hit_time=dur_s)
+    return instrument
+
+
+@dataclass(frozen=True)
+class NoteEvent:
+    # "c4", "gis" (octave 4), (Note.C, 4) or a frequency
+    note:       str | tuple[Note, int] | float
+    # seconds
+    start:      float
+    dur:        float
+    velocity:   float = 1
+    instrument: str = "default"
+
+    @property
+    def freq(self) -> float:
+        if isinstance(self.note, str):
+            return note_to_freq(*str_to_note(self.note))
+        if isinstance(self.note, tuple):
+            return note_to_freq(*self.note)
+        return float(self.note)
+
+
+def chord(notes: str, start: float, dur: float, **kwargs) -> list[NoteEvent]:
+    """NoteEvents of a string of notes (like `note_str_to_freqs`), e.g. `chord("c e g", 0, 1.5)`"""
+    return [NoteEvent(note, start, dur, **kwargs) for note in notes.split(" ")]
+
+
+@dataclass
+class ScheduledNote:
+    event:      NoteEvent
+    # start in samples
+    offset:     int
+    # samples of the rendered note that are played
+    length:     int
+    # cut short (with a fade out), as its voice was needed for a later note
+    stolen:     bool = False
+
+
+@dataclass
+class Sequencer:
+    """Plays NoteEvents on at most `max_voices` voices at a time\n
+    when a note starts and every voice is busy, the voice that started first is faded out and taken\n
+    the rendered notes stay in `notes` (LRU, at most `cache_bytes` big) across renders"""
+    instruments:    dict[str, Instrument] = field(default_factory=dict)
+    max_voices:     int = 32
+    sample_rate:    int = 48000
+    cache_bytes:    int = 1 << 27
+    events:         list[NoteEvent] = field(default_factory=list)
+
+    def __post_init__(self):
+        assert self.max_voices > 0
+        self.instruments = {"default": enveloped()} | self.instruments
+        self.notes = RenderMemo(self.cache_bytes)
+
+    def add(self, *events: NoteEvent) -> Self:
+        self.events.extend(events)
+        return self
+
+    def note_samples(self, event: NoteEvent) -> np.ndarray:
+        """the rendered note (at velocity 1), from the cache if it was rendered before"""
+        key = (event.instrument, event.freq, int(event.dur * self.sample_rate), self.sample_rate)
+        values = self.notes.get(key)
+        if values is None:
+            instrument = self.instruments.get(event.instrument)
+            if instrument is None:
+                raise ValueError(f"Unknown instrument `{event.instrument}`!")
+            track = instrument(event.freq, event.dur, self.sample_rate)
+            values = FrozenMonoTrack(track, self.sample_rate).track
+            self.notes.put(key, values)
+        return values
+
+    def schedule(self) -> list[ScheduledNote]:
+        """the notes in the order of their starts, with the samples they play for"""
+        scheduled = []
+        # (end sample, start sample, index into scheduled) of the sounding voices
+        voices = []
+        for event in sorted(self.events, key=lambda event: event.start):
+            offset = int(event.start * self.sample_rate)
+            while voices and voices[0][0] <= offset:
+                heappop(voices)
+            if len(voices) >= self.max_voices:
+                self._steal(voices, scheduled, offset)
+            note = ScheduledNote(event, offset, len(self.note_samples(event)))
+            scheduled.append(note)
+            heappush(voices, (offset + note.length, offset, len(scheduled) - 1))
+        return scheduled
+
+    def _steal(self, voices: list[tuple[int, int, int]], scheduled: list[ScheduledNote], offset: int):
+        """fades out the voice that started first"""
+        first = min(range(len(voices)), key=lambda j: voices[j][1:])
+        _, start, index = voices.pop(first)
+        heapify(voices)
+        note = scheduled[index]
+        note.length = min(note.length, offset - start + int(STEAL_FADE * self.sample_rate))
+        note.stolen = True
+
+    def render(self) -> FrozenMonoTrack:
+        scheduled = self.schedule()
+        out = np.zeros(max((note.offset + note.length for note in scheduled), default=0))
+        fade_n = int(STEAL_FADE * self.sample_rate)
+        for note in scheduled:
+            values = self.note_samples(note.event)[:note.length] * note.event.velocity
+            if note.stolen:
+                fade = min(fade_n, len(values))
+                values[len(values) - fade:] *= np.linspace(1, 0, fade)
+            out[note.offset: note.offset + len(values)] += values
+        return FrozenMonoTrack.from_list(out, self.sample_rate)
+
+    def to_audio(self, *, bit_p_sample: int = 16, audio_fmt: int = WAVE_FORMAT_PCM) -> AudioData:
+        return self.render().to_audio(bit_p_sample=bit_p_sample, audio_fmt=audio_fmt)
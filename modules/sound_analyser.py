@@ -1,6 +1,7 @@
 
 from itertools import islice
 from typing import Iterator
+from numpy.lib.stride_tricks import sliding_window_view
 from scipy.fft import fft
 from scipy.signal.windows import blackman
 
@@ -12,7 +13,8 @@ def fft_full(snippet: FrozenMonoTrack) -> list[float]:
     """FFT on the snippet (from 0 to 24000 Hz)\n
     freq.res = `1/dur Hz` (where dur is the duration of the snippet, assuming SR of 24000) \n
     iow. generates 1 data point for every data point in the snippet\n
-    eg. a 0.2 second snippet has a frequency resolution of 1/0.2 Hz = 5 Hz"""
+    eg. a 0.2 second snippet has a frequency resolution of 1/0.2 Hz = 5 Hz\n
+    works on the sample buffer of the snippet directly"""
     res = fft(snippet.track, snippet.sample_n)
     print(snippet.dur, len(res))
     return res[:len(res)//2]
@@ -23,11 +25,18 @@ def fft_shorttime(
         freq_resolution: float
     ) -> Iterator[list[float]]:
     """freq_resolution: difference between frequencies in neighboring entries\n
-    times_per_sec: how many times per second to perform an FFT"""
-    dur = 1/freq_resolution * 24000/track.sample_rate
+    times_per_sec: how many times per second to perform an FFT\n
+    a FrozenMonoTrack is windowed as views into its sample buffer (nothing is copied)"""
+    # a window of `dur` seconds resolves frequencies 1/dur Hz apart, at any sample rate
+    dur = 1/freq_resolution
     window_size = int(dur * track.sample_rate)
     window_step = int(track.sample_rate/times_per_sec)
     print(f"{window_size=} {window_step=}")
+    if isinstance(track, FrozenMonoTrack):
+        if track.sample_n < window_size:
+            return iter([])
+        windows = sliding_window_view(track.track, window_size)[::window_step]
+        return (fft(win, window_size) for win in windows)
     return (fft(win, window_size) for win in windowed(iter(track), window_size, window_step))
 
 def peak_iter(lis: list[float], *, lo_threshold: float) -> Iterator:
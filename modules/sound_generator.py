@@ -1,14 +1,20 @@
 
 """Only works for PCM ints"""
 
+from copy import copy
 from itertools import cycle
-from math import sin, tau, log2
+from math import ceil, sin, tau, log2
 from typing import Callable, Iterator
 from enum import IntEnum
 
+import numpy as np
+
 from .helpers import clamp
+from .wavetable import INTERPOLATIONS, Wavetable, lookup, lookup_one, wavetable
 
 SAMPLE_RATE = 48000
+# samples computed at once by the vectorized waves (`MultiSine`, `IntegratedWave`)
+VECTOR_BLOCK = 1024
 
 # ======================
 # Note stuff
@@ -68,115 +74,546 @@ TRIANG_WAVE = lambda phase: 1 - abs(2 - abs(4*phase - 3))
 SQUARE_WAVE = lambda phase: -1 if phase < 0.5 else 1
 SAWTOOTH_WAVE = lambda phase: 2 * phase - 1
 
+# ======================
+# Seekable Sound Iterators
+class ClosedFormWave:
+    """Iterator of the samples `sample(0), ..., sample(sample_n - 1)`\n
+    since every sample is known in closed form, `skip` jumps ahead in O(1)
+    (used by the tracks for seeking)"""
+    def __init__(self, sample_n: int) -> None:
+        self.sample_n = sample_n
+        self._i = 0
+
+    def sample(self, i: int) -> float:
+        ...
+
+    def samples(self, i: np.ndarray) -> np.ndarray:
+        """`sample` for an array of indices"""
+        return np.fromiter(map(self.sample, i.tolist()), np.float64, len(i))
+
+    def read(self, n: int) -> np.ndarray:
+        """the next (up to) n samples as an array"""
+        stop = min(self._i + n, self.sample_n)
+        ret = self.samples(np.arange(self._i, stop))
+        self._i = stop
+        return ret
+
+    def key(self) -> tuple:
+        """the parameters, equal for equal waves"""
+        ...
+
+    def fresh(self):
+        """a copy starting over at the first sample"""
+        ret = copy(self)
+        ret._i = 0
+        return ret
+
+    def skip(self, n: int):
+        self._i = min(self._i + n, self.sample_n)
+
+    def __len__(self) -> int:
+        """number of samples left"""
+        return self.sample_n - self._i
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> float:
+        if self._i >= self.sample_n:
+            raise StopIteration
+        y = self.sample(self._i)
+        self._i += 1
+        return y
+
+
+class Sine(ClosedFormWave):
+    def __init__(self, f: float, dur_s: float, *, vol: float = 1, phase: float = 0, sample_rate: int = SAMPLE_RATE) -> None:
+        super().__init__(int(sample_rate * dur_s))
+        self.f = f
+        self.vol = vol
+        self.phase = phase
+        self.sample_rate = sample_rate
+
+    def key(self) -> tuple:
+        return ("Sine", self.sample_n, self.f, self.vol, self.phase, self.sample_rate)
+
+    def sample(self, i: int) -> float:
+        t = i/self.sample_rate
+        return self.vol * sin(tau * self.f * t + self.phase)
+
+    def samples(self, i: np.ndarray) -> np.ndarray:
+        t = i/self.sample_rate
+        return self.vol * np.sin(tau * self.f * t + self.phase)
+
+
+class MultiSine(ClosedFormWave):
+    """Additive bank: `1/volsum * sum(vol * sin(tau*f*t + phase))` over the partials,
+    all partials of a block at once\n
+    fs_end / vols_end: linear ramps of the frequencies / volumes, reached at the end\n
+    with constant frequencies, a block is a matrix product with rotations that are computed once,
+    the phases at the start of every block are computed exactly (nothing drifts)"""
+    def __init__(
+            self,
+            fs: list[float],
+            dur_s: float, *,
+            vols: list[float],
+            phases: list[float],
+            fs_end: list[float] | None = None,
+            vols_end: list[float] | None = None,
+            sample_rate: int = SAMPLE_RATE
+        ) -> None:
+        super().__init__(int(sample_rate * dur_s))
+        self.fs = fs
+        self.vols = vols
+        self.phases = phases
+        self.fs_end = fs_end
+        self.vols_end = vols_end
+        self.dt = 1/sample_rate
+        self.volsum = sum(vols)
+
+        n = max(self.sample_n, 1)
+        self._f = np.array(fs, dtype=np.float64)
+        self._vol = np.array(vols, dtype=np.float64) / self.volsum
+        self._phase = np.array(phases, dtype=np.float64)
+        # change per sample
+        self._df = None if fs_end is None else (np.array(fs_end, dtype=np.float64) - self._f) / n
+        self._dvol = None if vols_end is None else (np.array(vols_end, dtype=np.float64) / self.volsum - self._vol) / n
+        # shared by the fresh copies
+        self._rotations: dict[str, np.ndarray] = {}
+        # (f, vol, phase, df, dvol) as floats, for single samples
+        self._partials = list(zip(
+            self._f.tolist(), self._vol.tolist(), self._phase.tolist(),
+            [0.0] * len(fs) if self._df is None else self._df.tolist(),
+            [0.0] * len(fs) if self._dvol is None else self._dvol.tolist()
+        ))
+
+    def key(self) -> tuple:
+        fs_end = None if self.fs_end is None else tuple(self.fs_end)
+        vols_end = None if self.vols_end is None else tuple(self.vols_end)
+        return ("MultiSine", self.sample_n, tuple(self.fs), tuple(self.vols), tuple(self.phases), self.dt, fs_end, vols_end)
+
+    def sample(self, i: int) -> float:
+        """a plain sum of `math.sin`s, numpy doesn't pay off for a single sample"""
+        w = tau * self.dt
+        if self._df is None and self._dvol is None:
+            return sum(vol * sin(w * (f*i) + phase) for f, vol, phase, _, _ in self._partials)
+        ramp = i*(i-1)/2
+        return sum((vol + dvol*i) * sin(w * (f*i + df*ramp) + phase) for f, vol, phase, df, dvol in self._partials)
+
+    def samples(self, i: np.ndarray) -> np.ndarray:
+        i = np.asarray(i, dtype=np.float64)
+        out = np.empty(len(i))
+        for start in range(0, len(i), VECTOR_BLOCK):
+            out[start: start+VECTOR_BLOCK] = self._direct(i[start: start+VECTOR_BLOCK])
+        return out
+
+    def read(self, n: int) -> np.ndarray:
+        if self._df is not None:
+            return super().read(n)
+        stop = min(self._i + n, self.sample_n)
+        out = np.empty(stop - self._i)
+        for start in range(self._i, stop, VECTOR_BLOCK):
+            m = min(VECTOR_BLOCK, stop - start)
+            out[start - self._i: start - self._i + m] = self._rotated(start, m)
+        self._i = stop
+        return out
+
+    def _direct(self, i: np.ndarray) -> np.ndarray:
+        """every sample of every partial by its phase (frequency ramps: sum of the frequencies before i)"""
+        cycles = self._f[:, None] * i
+        if self._df is not None:
+            cycles += self._df[:, None] * (i*(i-1)/2)
+        sines = np.sin(tau * self.dt * cycles + self._phase[:, None])
+        if self._dvol is None:
+            return self._vol @ sines
+        return ((self._vol[:, None] + self._dvol[:, None] * i) * sines).sum(axis=0)
+
+    def _rotated(self, start: int, m: int) -> np.ndarray:
+        """constant frequencies: the phasors at `start`, turned by `exp(i*tau*f*dt*k)` for the k-th sample of the block"""
+        if not self._rotations:
+            k = np.arange(VECTOR_BLOCK)
+            self._rotations["rot"] = np.exp(1j * tau * self.dt * self._f[:, None] * k)
+            if self._dvol is not None:
+                self._rotations["ramp"] = self._rotations["rot"] * k
+        phasors = np.exp(1j * (tau * (self._f * self.dt * start % 1) + self._phase))
+        vols = self._vol if self._dvol is None else self._vol + self._dvol * start
+        out = (vols * phasors) @ self._rotations["rot"][:, :m]
+        if self._dvol is not None:
+            out += (self._dvol * phasors) @ self._rotations["ramp"][:, :m]
+        return out.imag
+
+
+class TableWave(ClosedFormWave):
+    """`table` played at the frequency f (phase in cycles),
+    from the mipmap level that fits f (see `wavetable.Wavetable`)\n
+    band_limited: False reads the full cycle at every frequency (level 0, aliases like a naive oscillator;
+    the interpolation runs across the end of the cycle, a jump there is smoothed over one sample)"""
+    def __init__(
+            self,
+            table: Wavetable,
+            f: float,
+            dur_s: float, *,
+            vol: float = 1,
+            phase: float = 0,
+            sample_rate: int = SAMPLE_RATE,
+            interpolation: str = "linear",
+            band_limited: bool = True
+        ) -> None:
+        assert interpolation in INTERPOLATIONS
+        super().__init__(int(sample_rate * dur_s))
+        self.wavetable = table
+        self.f = f
+        self.vol = vol
+        self.phase = phase
+        self.sample_rate = sample_rate
+        self.interpolation = interpolation
+        self.band_limited = band_limited
+        self.d_phase = f/sample_rate
+        self._table = table.table(table.level_for(f, sample_rate) if band_limited else 0)
+
+    def key(self) -> tuple:
+        return ("TableWave", self.sample_n, self.wavetable.key(), self.f, self.vol, self.phase, self.sample_rate, self.interpolation, self.band_limited)
+
+    def sample(self, i: int) -> float:
+        return self.vol * lookup_one(self._table, (self.phase + i*self.d_phase) % 1, self.interpolation)
+
+    def samples(self, i: np.ndarray) -> np.ndarray:
+        return self.vol * lookup(self._table, (self.phase + i*self.d_phase) % 1, self.interpolation)
+
+
+class MultiTableWave(ClosedFormWave):
+    """`TableWave`s of the same table, mixed like `MultiSine` (band_limited: see `TableWave`)"""
+    def __init__(
+            self,
+            table: Wavetable,
+            fs: list[float],
+            dur_s: float, *,
+            vols: list[float],
+            phases: list[float],
+            sample_rate: int = SAMPLE_RATE,
+            interpolation: str = "linear",
+            band_limited: bool = True
+        ) -> None:
+        assert interpolation in INTERPOLATIONS
+        super().__init__(int(sample_rate * dur_s))
+        self.wavetable = table
+        self.fs = fs
+        self.vols = vols
+        self.phases = phases
+        self.sample_rate = sample_rate
+        self.interpolation = interpolation
+        self.band_limited = band_limited
+        self.volsum = sum(vols)
+        self._partials = [
+            (table.table(table.level_for(f, sample_rate) if band_limited else 0), f/sample_rate, vol, phase)
+            for f, vol, phase in zip(fs, vols, phases)
+        ]
+
+    def key(self) -> tuple:
+        return (
+            "MultiTableWave", self.sample_n, self.wavetable.key(), tuple(self.fs), tuple(self.vols), tuple(self.phases),
+            self.sample_rate, self.interpolation, self.band_limited
+        )
+
+    def sample(self, i: int) -> float:
+        return 1/self.volsum * sum(
+            vol * lookup_one(tab, (phase + i*d_phase) % 1, self.interpolation)
+            for tab, d_phase, vol, phase in self._partials
+        )
+
+    def samples(self, i: np.ndarray) -> np.ndarray:
+        return 1/self.volsum * sum(
+            vol * lookup(tab, (phase + i*d_phase) % 1, self.interpolation)
+            for tab, d_phase, vol, phase in self._partials
+        )
+
+class FunctionWave(ClosedFormWave):
+    """`wave_fun` evaluated at every sample's phase, like a naive oscillator
+    (nothing is band-limited, high notes alias)"""
+    def __init__(self, wave_fun: FFFunc, f: float, dur_s: float, *, vol: float = 1, phase: float = 0, sample_rate: int = SAMPLE_RATE) -> None:
+        super().__init__(int(sample_rate * dur_s))
+        self.wave_fun = wave_fun
+        self.f = f
+        self.vol = vol
+        self.phase = phase
+        self.sample_rate = sample_rate
+        self.d_phase = f/sample_rate
+
+    def key(self) -> tuple:
+        return ("FunctionWave", self.sample_n, self.wave_fun, self.f, self.vol, self.phase, self.sample_rate)
+
+    def sample(self, i: int) -> float:
+        return self.vol * self.wave_fun((self.phase + i*self.d_phase) % 1)
+
+
+class MultiFunctionWave(ClosedFormWave):
+    """`FunctionWave`s of the same phase function, mixed like `MultiSine`"""
+    def __init__(
+            self,
+            wave_fun: FFFunc,
+            fs: list[float],
+            dur_s: float, *,
+            vols: list[float],
+            phases: list[float],
+            sample_rate: int = SAMPLE_RATE
+        ) -> None:
+        super().__init__(int(sample_rate * dur_s))
+        self.wave_fun = wave_fun
+        self.fs = fs
+        self.vols = vols
+        self.phases = phases
+        self.sample_rate = sample_rate
+        self.volsum = sum(vols)
+        self._partials = [(f/sample_rate, vol, phase) for f, vol, phase in zip(fs, vols, phases)]
+
+    def key(self) -> tuple:
+        return ("MultiFunctionWave", self.sample_n, self.wave_fun, tuple(self.fs), tuple(self.vols), tuple(self.phases), self.sample_rate)
+
+    def sample(self, i: int) -> float:
+        wave_fun = self.wave_fun
+        return 1/self.volsum * sum(vol * wave_fun((phase + i*d_phase) % 1) for d_phase, vol, phase in self._partials)
+
+
+class IntegratedWave(ClosedFormWave):
+    """Sine whose phase is the running sum of `frequencies`, integrated a block at a time
+    (cumulative sum, the phase is carried over between blocks)\n
+    there's no closed form, `skip` integrates over the skipped samples (vectorized, but not O(1))"""
+    def __init__(self, sample_n: int, *, vol: float = 1, sample_rate: int = SAMPLE_RATE) -> None:
+        super().__init__(sample_n)
+        self.vol = vol
+        self.sample_rate = sample_rate
+        self.dt = 1/sample_rate
+        # in range [0, 1), the phase of the sample before `_i`
+        self._phase = 0.0
+
+    def frequencies(self, start: int, n: int) -> np.ndarray:
+        """the frequencies that advance the phase to the samples `start, ..., start+n-1`"""
+        ...
+
+    def _advance(self, n: int, out: np.ndarray | None = None):
+        """integrates the next n samples, writes their values into `out` (if given)"""
+        pos = 0
+        while pos < n:
+            m = min(VECTOR_BLOCK, n - pos)
+            phases = self._phase + np.cumsum(self.dt * self.frequencies(self._i, m))
+            if out is not None:
+                out[pos: pos+m] = self.vol * np.sin(tau * phases)
+            self._phase = phases[-1] % 1
+            self._i += m
+            pos += m
+
+    def read(self, n: int) -> np.ndarray:
+        out = np.empty(min(n, len(self)))
+        self._advance(len(out), out)
+        return out
+
+    def skip(self, n: int):
+        self._advance(min(n, len(self)))
+
+    def fresh(self):
+        ret = super().fresh()
+        ret._phase = 0.0
+        return ret
+
+    def __next__(self) -> float:
+        if self._i >= self.sample_n:
+            raise StopIteration
+        return float(self.read(1)[0])
+
+
+class FrequencyWave(IntegratedWave):
+    """frequency: function of the time in seconds (called with arrays of times if `vectorized`)
+    or the frequency of every sample (array, list or track; the last one is held if it's too short),
+    kept between 20 and 20000 Hz"""
+    def __init__(
+            self,
+            frequency: Callable[[float], float] | np.ndarray,
+            dur_s: float, *,
+            vol: float = 1,
+            sample_rate: int = SAMPLE_RATE,
+            vectorized: bool = False
+        ) -> None:
+        super().__init__(int(sample_rate * dur_s), vol=vol, sample_rate=sample_rate)
+        self.frequency = frequency
+        self.vectorized = vectorized
+        # the control samples, rendered on first use (shared by the fresh copies)
+        self._control: dict[str, np.ndarray] = {}
+
+    def key(self) -> tuple:
+        return ("FrequencyWave", self.sample_n, self.frequency, self.vectorized, self.vol, self.sample_rate)
+
+    def _control_values(self) -> np.ndarray:
+        values = self._control.get("values")
+        if values is None:
+            if hasattr(self.frequency, "iter_blocks"):
+                values = np.concatenate([np.zeros(0), *self.frequency.iter_blocks()])
+            else:
+                values = np.asarray(self.frequency, dtype=np.float64)
+            assert len(values), "the control track is empty"
+            self._control["values"] = values
+        return values
+
+    def frequencies(self, start: int, n: int) -> np.ndarray:
+        if callable(self.frequency):
+            t = np.arange(start, start + n) * self.dt
+            if self.vectorized:
+                fs = np.broadcast_to(self.frequency(t), (n,))
+            else:
+                fs = np.fromiter(map(self.frequency, t.tolist()), np.float64, n)
+        else:
+            values = self._control_values()
+            fs = values[np.minimum(np.arange(start, start + n), len(values) - 1)]
+        return np.clip(fs, 20, 20000)
+
+
+class SwitchingWave(IntegratedWave):
+    """Plays one period of `fs[0]`, then one of `fs[1]`, etc (cycling through fs)\n
+    the switches are scheduled once (a step per period, not per sample)"""
+    def __init__(self, fs: list[float], dur_s: float, *, vol: float = 1, sample_rate: int = SAMPLE_RATE) -> None:
+        assert len(fs) and all(f > 0 for f in fs)
+        super().__init__(int(sample_rate * dur_s), vol=vol, sample_rate=sample_rate)
+        self.fs = fs
+        # (first samples of the periods, their frequencies), shared by the fresh copies
+        self._schedule: dict[str, np.ndarray] = {}
+
+    def key(self) -> tuple:
+        return ("SwitchingWave", self.sample_n, tuple(self.fs), self.vol, self.sample_rate)
+
+    def _switches(self) -> tuple[np.ndarray, np.ndarray]:
+        if not self._schedule:
+            starts, freqs = [], []
+            start, phase = 0, 0.0
+            f_it = cycle(self.fs)
+            while start < self.sample_n:
+                f = next(f_it)
+                # samples until the phase reaches 1 (a period that ends right on a sample, ends there)
+                n = max(ceil((1 - phase) / (self.dt * f) - 1e-9), 1)
+                starts.append(start)
+                freqs.append(f)
+                start += n
+                phase = max(phase + n * self.dt * f - 1, 0.0)
+            self._schedule["starts"] = np.array(starts)
+            self._schedule["freqs"] = np.array(freqs, dtype=np.float64)
+        return self._schedule["starts"], self._schedule["freqs"]
+
+    def frequencies(self, start: int, n: int) -> np.ndarray:
+        # sample i is reached with the frequency of sample i-1 (the first one plays phase 0)
+        starts, freqs = self._switches()
+        before = np.arange(start - 1, start - 1 + n)
+        fs = freqs[np.maximum(np.searchsorted(starts, before, side="right") - 1, 0)]
+        return np.where(before < 0, 0, fs)
+
+
 # ======================
 # Sound Iterators
-def silence(dur_s: float) -> Iterator[float]:
-    sample_n = int(SAMPLE_RATE * dur_s)
+def silence(dur_s: float, *, sample_rate: int = SAMPLE_RATE) -> Iterator[float]:
+    sample_n = int(sample_rate * dur_s)
     for _ in range(sample_n):
         yield 0
 
-def wave(wave_fun: FFFunc, f: float, dur_s: float, *, vol: float = 1, phase: float = 0) -> Iterator[float]:
+def wave(
+        wave_fun: FFFunc | Wavetable,
+        f: float,
+        dur_s: float, *,
+        vol: float = 1,
+        phase: float = 0,
+        sample_rate: int = SAMPLE_RATE,
+        interpolation: str = "linear",
+        band_limited: bool = True
+    ) -> Iterator[float]:
+    """wave_fun: a phase function (sampled into a table once, see `wavetable.wavetable`)
+    or a `wavetable.Wavetable` (e.g. of a drawn cycle)\n
+    interpolation: between the table entries, "linear" or "cubic" (slower, but smoother)\n
+    band_limited: drop the harmonics above the nyquist frequency (see `wavetable.Wavetable`),
+    False: the naive oscillator (aliasing included), a phase function is evaluated at every sample
+    (see `FunctionWave`), a Wavetable is read from its full cycle"""
     assert 20 <= f <= 20000
-    sample_n = int(SAMPLE_RATE * dur_s)
-    d_phase = f/SAMPLE_RATE
-
-    for _ in range(sample_n):
-        y = wave_fun(phase)
-        phase += d_phase
-        phase %= 1
-        yield vol*y
+    if not band_limited and not isinstance(wave_fun, Wavetable):
+        return FunctionWave(wave_fun, f, dur_s, vol=vol, phase=phase, sample_rate=sample_rate)
+    table = wave_fun if isinstance(wave_fun, Wavetable) else wavetable(wave_fun)
+    return TableWave(
+        table, f, dur_s,
+        vol=vol, phase=phase, sample_rate=sample_rate, interpolation=interpolation, band_limited=band_limited
+    )
 
 # @to_mono_track
-def sine(f: float, dur_s: float, *, vol: float = 1, phase: float = 0) -> Iterator[float]:
+def sine(f: float, dur_s: float, *, vol: float = 1, phase: float = 0, sample_rate: int = SAMPLE_RATE) -> Iterator[float]:
     assert 20 <= f <= 20000
-
-    sample_n = int(SAMPLE_RATE * dur_s)
-    for i in range(sample_n):
-        t = i/SAMPLE_RATE
-        y = vol * sin(tau * f * t + phase)
-        yield y
-
-def triang(f: float, dur_s: float, *, vol: float = 1, phase: float = 0) -> Iterator[float]:
-    return wave(TRIANG_WAVE, f, dur_s, vol=vol, phase=phase)
-
-def square(f: float, dur_s: float, *, vol: float = 1, phase: float = 0) -> Iterator[float]:
-    return wave(SQUARE_WAVE, f, dur_s, vol=vol, phase=phase)
-
-def sawtooth(f: float, dur_s: float, *, vol: float = 1, phase: float = 0) -> Iterator[float]:
-    return wave(SAWTOOTH_WAVE, f, dur_s, vol=vol, phase=phase)
-
-def multi_wave(wave: FFFunc, fs: list[float], dur_s: float, *, vols: list[float] = ..., phases: list[float] = ...) -> Iterator[float]:
+    return Sine(f, dur_s, vol=vol, phase=phase, sample_rate=sample_rate)
+
+def triang(f: float, dur_s: float, *, vol: float = 1, phase: float = 0, sample_rate: int = SAMPLE_RATE) -> Iterator[float]:
+    return wave(TRIANG_WAVE, f, dur_s, vol=vol, phase=phase, sample_rate=sample_rate)
+
+def square(f: float, dur_s: float, *, vol: float = 1, phase: float = 0, sample_rate: int = SAMPLE_RATE) -> Iterator[float]:
+    return wave(SQUARE_WAVE, f, dur_s, vol=vol, phase=phase, sample_rate=sample_rate)
+
+def sawtooth(f: float, dur_s: float, *, vol: float = 1, phase: float = 0, sample_rate: int = SAMPLE_RATE) -> Iterator[float]:
+    return wave(SAWTOOTH_WAVE, f, dur_s, vol=vol, phase=phase, sample_rate=sample_rate)
+
+def multi_wave(
+        wave: FFFunc | Wavetable,
+        fs: list[float],
+        dur_s: float, *,
+        vols: list[float] = ...,
+        phases: list[float] = ...,
+        sample_rate: int = SAMPLE_RATE,
+        interpolation: str = "linear",
+        band_limited: bool = True
+    ) -> Iterator[float]:
+    """like `wave`, for every frequency in fs"""
     n = len(fs)
     if vols == ...:
         vols = [1]*n
     if phases == ...:
         phases = [0]*n
     assert len(phases) == n and len(vols) == n
-
-    sample_n = int(SAMPLE_RATE * dur_s)
-    volsum = sum(vols)
-    periods = [f/SAMPLE_RATE for f in fs]
-    
-    current_phases = phases.copy()
-
-    for _ in range(sample_n):
-        y = 1/volsum * sum(vol * wave(phase) for vol, phase in zip(vols, current_phases))
-        current_phases = [(c + period) % 1 for c, period in zip(current_phases, periods)]
-        yield y
+    if not band_limited and not isinstance(wave, Wavetable):
+        return MultiFunctionWave(wave, fs, dur_s, vols=vols, phases=phases, sample_rate=sample_rate)
+    table = wave if isinstance(wave, Wavetable) else wavetable(wave)
+    return MultiTableWave(
+        table, fs, dur_s,
+        vols=vols, phases=phases, sample_rate=sample_rate, interpolation=interpolation, band_limited=band_limited
+    )
 
 # @to_mono_track
-def multi_sine(fs: list[float], dur_s: float, *, vols: list[float] = ..., phases: list[float] = ...) -> Iterator[float]:
+def multi_sine(
+        fs: list[float],
+        dur_s: float, *,
+        vols: list[float] = ...,
+        phases: list[float] = ...,
+        fs_end: list[float] | None = None,
+        vols_end: list[float] | None = None,
+        sample_rate: int = SAMPLE_RATE
+    ) -> Iterator[float]:
+    """fs_end / vols_end: frequencies / volumes at the end, ramped linearly from fs / vols (see `MultiSine`)"""
     n = len(fs)
     if vols == ...:
         vols = [1]*n
     if phases == ...:
         phases = [0]*n
     assert len(phases) == n and len(vols) == n
-
-    sample_n = int(SAMPLE_RATE * dur_s)
-    dt = 1/SAMPLE_RATE
-
-    volsum = sum(vols)
-    
-    for i in range(sample_n):
-        t = i*dt
-        y = 1/volsum * sum(vol * sin(tau * freq * t + phase) for freq, vol, phase in zip(fs, vols, phases))
-        yield y
+    assert fs_end is None or len(fs_end) == n
+    assert vols_end is None or len(vols_end) == n
+    return MultiSine(fs, dur_s, vols=vols, phases=phases, fs_end=fs_end, vols_end=vols_end, sample_rate=sample_rate)
 
 # @to_mono_track
-def evolving_frequency(t_f_func: Callable[[float], float], dur_s: float, *, vol: float = 1) -> Iterator[float]:
-    """f_func gives the frequency at each point"""
-    sample_n = int(SAMPLE_RATE * dur_s)
-    dt = 1/SAMPLE_RATE
-
-    phase = 0 # in range [0, 1)
-
-    for i in range(sample_n):
-        t = i*dt
-        f = clamp(t_f_func(t), 20, 20000)
-        phase += dt*f  # T = 1/f; dt/T
-        phase %= 1
-        y = vol*sin(tau*phase)
-        yield y
-
-def jirj(fs: list[float], dur_s: float, *, vol: float = 1) -> Iterator[float]:
+def evolving_frequency(
+        t_f_func: Callable[[float], float] | np.ndarray,
+        dur_s: float, *,
+        vol: float = 1,
+        sample_rate: int = SAMPLE_RATE,
+        vectorized: bool = False
+    ) -> Iterator[float]:
+    """f_func gives the frequency at each point\n
+    vectorized: f_func also works on arrays of times (much faster)\n
+    instead of f_func, the frequency of every sample can be given (array or control track, see `FrequencyWave`)"""
+    return FrequencyWave(t_f_func, dur_s, vol=vol, sample_rate=sample_rate, vectorized=vectorized)
+
+def jirj(fs: list[float], dur_s: float, *, vol: float = 1, sample_rate: int = SAMPLE_RATE) -> Iterator[float]:
     """switches between frequency `fs[0]`, then `fs[1]`, etc"""
-    sample_n = int(SAMPLE_RATE * dur_s)
-    dt = 1/SAMPLE_RATE
-
-    phase = 0  # in range [0, 1)
-    f_it = cycle(fs)
-    f = next(f_it)
-
-    for i in range(sample_n):
-        y = vol*sin(tau*phase)
-        phase += dt*f  # T = 1/f; dt/T
-        if phase >= 1:
-            f = next(f_it)
-            phase %= 1
-        yield y
-
-def sine_with_harmonics(fundamental: float, num_of_harmonics: int, vol_fun: Callable[[int], float], *, dur_s: float) -> Iterator[float]:
+    return SwitchingWave(fs, dur_s, vol=vol, sample_rate=sample_rate)
+
+def sine_with_harmonics(fundamental: float, num_of_harmonics: int, vol_fun: Callable[[int], float], *, dur_s: float, sample_rate: int = SAMPLE_RATE) -> Iterator[float]:
     """num_of_harmonics: including the fundamental\n
     vol_fun: volume for each harmonic (3rd harmonic would be `vol_fun(3)` in volume).
     """
@@ -184,4 +621,4 @@ def sine_with_harmonics(fundamental: float, num_of_harmonics: int, vol_fun: Call
     fs = [fundamental*i for i in range(1, num_of_harmonics+1)]
     vols = [clamp(vol_fun(i), -1, 1) for i in range(1, num_of_harmonics+1)]
 
-    return multi_sine(fs, dur_s, vols=vols)
\ No newline at end of file
+    return multi_sine(fs, dur_s, vols=vols, sample_rate=sample_rate)
\ No newline at end of file
@@ -1,14 +1,378 @@
 
+import sys
+import sysconfig
 from abc import ABC
-from dataclasses import dataclass
-from typing import Callable, Iterator, Self
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields
+from functools import partial
+from hashlib import sha1
+from heapq import heapify, heappop
+from itertools import chain, islice
+from types import CodeType, FunctionType, ModuleType
+from typing import Callable, Hashable, Iterator, Self
 
-from modules.wav_rw import AudioData
+import numpy as np
+
+from modules.wav_rw import (
+    WAVE_FORMAT_PCM,
+    AudioData,
+    WavStreamWriter,
+    intervals_to_samples,
+    samples_to_intervals
+)
 
 from .helpers import clamp, int_to_interval, interval_to_int
+from .player import PlaybackStats, PyAudioSink, Sink, StreamPlayer
+from .profiler import Profiler, RenderProfile, profiling
+from .resampler import Resampler, resample, resample_blocks
+from .envelope import ADSR, Envelope
+from .sound_generator import ClosedFormWave
 
 # Wie yield in FUnktionen implementieren?
 
+# Default number of samples per block of the block engine
+BLOCK_SIZE = 1024
+
+def channel_intervals(audio_data: AudioData, channel_index: int, *, chunk_size: int = 4096) -> Iterator[float]:
+    """the samples of one channel as floats, converted `chunk_size` at a time\n
+    (so a memory-mapped file is only read as far as it is iterated)"""
+    channel = audio_data.channel(channel_index)
+    for start in range(0, len(channel), chunk_size):
+        chunk = channel[start: start + chunk_size]
+        yield from samples_to_intervals(chunk, audio_data.byte_p_sample, audio_data.audio_fmt).tolist()
+
+# Block engine ========
+def buffered_blocks(it: Iterator[float], block_size: int) -> Iterator[np.ndarray]:
+    """Shim for sample by sample iterators: collects `block_size` samples per block"""
+    it = iter(it)
+    while len(block := np.fromiter(islice(it, block_size), np.float64)):
+        yield block
+
+def rechunk(blocks: Iterator[np.ndarray], block_size: int) -> Iterator[np.ndarray]:
+    """Blocks of any size -> blocks of `block_size` (only the last one may be shorter)"""
+    pending = []
+    pending_n = 0
+    for block in blocks:
+        pending.append(block)
+        pending_n += len(block)
+        if pending_n < block_size:
+            continue
+        joined = np.concatenate(pending)
+        full_n = pending_n - pending_n % block_size
+        for start in range(0, full_n, block_size):
+            yield joined[start: start + block_size]
+        pending = [joined[full_n:]]
+        pending_n -= full_n
+    if pending_n:
+        yield np.concatenate(pending)
+
+def skip_samples(blocks: Iterator[np.ndarray], n: int) -> Iterator[np.ndarray]:
+    """drops the first `n` samples"""
+    for block in blocks:
+        if n >= len(block):
+            n -= len(block)
+            continue
+        yield block[n:]
+        n = 0
+
+def take_samples(blocks: Iterator[np.ndarray], n: int) -> Iterator[np.ndarray]:
+    """only the first `n` samples"""
+    for block in blocks:
+        if n <= 0:
+            return
+        block = block[:n]
+        n -= len(block)
+        yield block
+
+def _node_blocks(node, start: int, block_size: int) -> Iterator[np.ndarray]:
+    if isinstance(node, MonoTrack):
+        # inside a graph, not a streamed MonoTrack (see `MonoTrack.iter_blocks`)
+        node = node.obj
+    if start <= 0:
+        iter_blocks = getattr(node, "iter_blocks", None)
+        if iter_blocks is None:
+            return buffered_blocks(node, block_size)
+        return iter_blocks(block_size)
+    iter_blocks_from = getattr(node, "iter_blocks_from", None)
+    if iter_blocks_from is None:
+        return rechunk(skip_samples(_node_blocks(node, 0, block_size), start), block_size)
+    return iter_blocks_from(start, block_size)
+
+def blocks_of(node, block_size: int) -> Iterator[np.ndarray]:
+    """The samples of a Track or IterationObject (or any iterable of floats) as blocks"""
+    return blocks_from(node, 0, block_size)
+
+def blocks_from(node, start: int, block_size: int) -> Iterator[np.ndarray]:
+    """Like `blocks_of`, but starting at sample `start`\n
+    nodes that can seek implement `iter_blocks_from(start, block_size)`,
+    all others are rendered from the beginning and the first samples are dropped\n
+    (timed per node while a `profiler.Profiler` is active)"""
+    if Profiler.active is None:
+        return _node_blocks(node, start, block_size)
+    return Profiler.active.profiled(node, lambda: _node_blocks(node, start, block_size))
+
+def length_of(node) -> int | None:
+    """number of samples of a node, None if it isn't known without rendering it"""
+    length = getattr(node, "length", None)
+    if length is None:
+        return len(node) if hasattr(node, "__len__") else None
+    return length()
+
+
+# Structural keys ======
+class Unkeyable(Exception):
+    """a parameter that can't be compared by value (e.g. a one-shot iterator)"""
+
+def array_digest(values) -> tuple:
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    return ("array", len(values), sha1(values.tobytes()).hexdigest())
+
+@dataclass(frozen=True)
+class KeyedFunction:
+    """A function with a key given by the caller, which stands in for it in `structural_key`
+    (e.g. for lambdas, which the render cache can't key otherwise)"""
+    fun: Callable
+    cache_key: Hashable
+
+    def __call__(self, *args):
+        return self.fun(*args)
+
+# globals of these types are compared by value
+GLOBAL_VALUE_TYPES = (type(None), bool, int, float, complex, str, bytes, np.generic, np.ndarray, list, tuple, dict)
+# modules below these directories (the standard library, installed packages) don't change between renders
+LIBRARY_PATHS = tuple({sysconfig.get_path(name) for name in ("stdlib", "platstdlib", "purelib", "platlib")})
+
+def _library(obj) -> bool:
+    """a module, or a function or class of a module, that is installed (or built in), not part of the project"""
+    module = obj if isinstance(obj, ModuleType) else sys.modules.get(getattr(obj, "__module__", None) or "")
+    if module is None:
+        return False
+    file = getattr(module, "__file__", None)
+    if file is None:
+        return module.__name__ in sys.builtin_module_names
+    return file.startswith(LIBRARY_PATHS)
+
+def _named(value) -> tuple:
+    return ("global", getattr(value, "__module__", None), getattr(value, "__qualname__", getattr(value, "__name__", None)))
+
+def _callable_key(value, seen: frozenset) -> Hashable:
+    """the key of a function or class a function reads from the globals\n
+    project functions and classes by their code (so editing a helper changes the key),
+    library ones (e.g. `math.sin`, `np.clip`) by their name"""
+    if isinstance(value, type):
+        if _library(value):
+            return _named(value)
+        methods = tuple((name, _function_key(attr, seen)) for name, attr in vars(value).items() if isinstance(attr, FunctionType))
+        return ("class", value.__module__, value.__qualname__, methods)
+    if isinstance(value, (FunctionType, partial, KeyedFunction)):
+        return _function_key(value, seen)
+    if _library(value):
+        # builtins, numpy ufuncs, ...
+        return _named(value)
+    return freeze(value)
+
+def _global_values(code: CodeType, namespace: dict, seen: frozenset) -> tuple:
+    """the module globals `code` reads (nested functions included), as (name, key)\n
+    values by value, functions and classes by `_callable_key` (transitively),
+    the functions and values of project modules also when they are read as module attributes,
+    objects that can't be frozen make the function unkeyable"""
+    ret = []
+    for name in code.co_names:
+        # names that aren't globals are attributes (or builtins)
+        if name not in namespace:
+            continue
+        value = namespace[name]
+        if isinstance(value, ModuleType):
+            if not _library(value):
+                ret.extend(_module_attributes(name, value, code.co_names, seen))
+            continue
+        if callable(value):
+            ret.append((name, _callable_key(value, seen)))
+            continue
+        if not isinstance(value, GLOBAL_VALUE_TYPES):
+            # e.g. an object that might be changed in place
+            raise Unkeyable(value)
+        ret.append((name, freeze(value)))
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            ret.extend(_global_values(const, namespace, seen))
+    return tuple(ret)
+
+def _module_attributes(name: str, module: ModuleType, names: tuple, seen: frozenset) -> list:
+    """`module.<attribute>` for the attribute names the code reads (a superset of the ones read from `module`)"""
+    ret = []
+    for attr_name in names:
+        attr = getattr(module, attr_name, None)
+        if isinstance(attr, (FunctionType, type)):
+            ret.append((f"{name}.{attr_name}", _callable_key(attr, seen)))
+        elif isinstance(attr, GLOBAL_VALUE_TYPES) and attr is not None:
+            ret.append((f"{name}.{attr_name}", freeze(attr)))
+    return ret
+
+def function_key(fun: Callable) -> Hashable:
+    """functions with the same code, the same closure values and the same values of the globals they read
+    (the code of the project functions they call included) are equal
+    (e.g. two envelopes from `MonoTrack.adsr` with the same arguments)"""
+    return _function_key(fun, frozenset())
+
+def _function_key(fun: Callable, seen: frozenset) -> Hashable:
+    """seen: the code of the functions further up, for recursive ones"""
+    if isinstance(fun, KeyedFunction):
+        return ("keyed", freeze(fun.cache_key))
+    if isinstance(fun, partial):
+        return ("partial", _function_key(fun.func, seen), freeze(fun.args), freeze(sorted(fun.keywords.items())))
+    if not isinstance(fun, FunctionType):
+        # e.g. builtins, compared by identity
+        try:
+            hash(fun)
+        except TypeError:
+            raise Unkeyable(fun)
+        return fun
+    if _library(fun):
+        return _named(fun)
+    if fun.__code__ in seen:
+        return ("recursive", fun.__qualname__)
+    # a global that changes between two renders changes the key (or the function can't be keyed)
+    global_values = _global_values(fun.__code__, fun.__globals__, seen | {fun.__code__})
+    try:
+        cells = tuple(freeze(cell.cell_contents) for cell in fun.__closure__ or ())
+        return ("function", fun.__code__, cells, freeze(fun.__defaults__), freeze(fun.__kwdefaults__), global_values)
+    except (Unkeyable, ValueError):
+        # compared by identity then
+        return fun
+
+def freeze(value) -> Hashable:
+    """hashable stand-in for a node parameter"""
+    if isinstance(value, (Track, IterationObject)):
+        return value.key()
+    if isinstance(value, np.ndarray):
+        return array_digest(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(x) for x in value)
+    if isinstance(value, dict):
+        return tuple((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, (ClosedFormWave, Envelope)):
+        return freeze(value.key())
+    if callable(value):
+        return function_key(value)
+    try:
+        hash(value)
+    except TypeError:
+        raise Unkeyable(value)
+    return value
+
+def structural_key(node) -> Hashable | None:
+    """Key of the subgraph below `node`: subgraphs with equal keys render the same samples\n
+    None if the subgraph can't be keyed (e.g. it reads from a one-shot iterator)"""
+    try:
+        return node.key()
+    except Unkeyable:
+        return None
+
+
+# Render memo ==========
+class RenderMemo:
+    """LRU cache of rendered subgraphs: structural key -> samples, at most `max_bytes` big\n
+    (max_bytes = 0 turns it off)\n
+    max_entry_bytes: bigger subgraphs aren't recorded (None: up to max_bytes)\n
+    recording: new subgraphs are recorded (else the memo is only read)"""
+    def __init__(self, max_bytes: int = 1 << 27, *, max_entry_bytes: int | None = None) -> None:
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.recording = True
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._buffers: OrderedDict[Hashable, np.ndarray] = OrderedDict()
+
+    @property
+    def entry_limit(self) -> int:
+        if self.max_entry_bytes is None:
+            return self.max_bytes
+        return min(self.max_entry_bytes, self.max_bytes)
+
+    def get(self, key: Hashable) -> np.ndarray | None:
+        values = self._buffers.get(key)
+        if values is None:
+            self.misses += 1
+            return None
+        self._buffers.move_to_end(key)
+        self.hits += 1
+        return values
+
+    def put(self, key: Hashable, values: np.ndarray):
+        if values.nbytes > self.entry_limit or key in self._buffers:
+            return
+        values.flags.writeable = False
+        self._buffers[key] = values
+        self.bytes += values.nbytes
+        while self.bytes > self.max_bytes:
+            _, old = self._buffers.popitem(last=False)
+            self.bytes -= old.nbytes
+
+    def clear(self):
+        self._buffers.clear()
+        self.bytes = 0
+
+# off, unless turned on with `render_memo`
+RENDER_MEMO = RenderMemo(0)
+
+@contextmanager
+def render_memo(max_bytes: int = 1 << 27, *, max_entry_bytes: int = 1 << 23) -> Iterator[RenderMemo]:
+    """Turns RENDER_MEMO on inside the with block (it is cleared afterwards):\n
+    `with render_memo(): track.to_audio()`, subgraphs that occur repeatedly are rendered once\n
+    max_entry_bytes: only subgraphs of at most this many samples * 8 are recorded"""
+    previous = (RENDER_MEMO.max_bytes, RENDER_MEMO.max_entry_bytes)
+    RENDER_MEMO.max_bytes, RENDER_MEMO.max_entry_bytes = max_bytes, max_entry_bytes
+    try:
+        yield RENDER_MEMO
+    finally:
+        RENDER_MEMO.max_bytes, RENDER_MEMO.max_entry_bytes = previous
+        RENDER_MEMO.clear()
+
+def _recorded(blocks: Iterator[np.ndarray], key: Hashable) -> Iterator[np.ndarray]:
+    """passes the blocks on and memoizes them once they are complete"""
+    recorded = []
+    for block in blocks:
+        yield block
+        recorded.append(block)
+    RENDER_MEMO.put(key, np.concatenate([np.zeros(0), *recorded]))
+
+def _streamed(blocks: Iterator[np.ndarray]) -> Iterator[np.ndarray]:
+    """the blocks, without recording into RENDER_MEMO while they are produced
+    (streaming renders stay in constant memory)"""
+    while True:
+        previous = RENDER_MEMO.recording
+        RENDER_MEMO.recording = False
+        try:
+            block = next(blocks, None)
+        finally:
+            RENDER_MEMO.recording = previous
+        if block is None:
+            return
+        yield block
+
+def memo_blocks(node, start: int, block_size: int) -> Iterator[np.ndarray]:
+    """`blocks_from` through RENDER_MEMO: unchanged subgraphs are rendered once\n
+    only subgraphs of known length, that fit into `RENDER_MEMO.entry_limit`, are recorded"""
+    while isinstance(node, MonoTrack):
+        node = node.obj
+    if not RENDER_MEMO.max_bytes or isinstance(node, (FromList, FrozenMonoTrack)):
+        # already a buffer
+        return blocks_from(node, start, block_size)
+    key = structural_key(node)
+    if key is None:
+        return blocks_from(node, start, block_size)
+    values = RENDER_MEMO.get(key)
+    if values is not None:
+        return (values[i: i + block_size] for i in range(start, len(values), block_size))
+    length = length_of(node)
+    if start > 0 or not RENDER_MEMO.recording or length is None or 8 * length > RENDER_MEMO.entry_limit:
+        return blocks_from(node, start, block_size)
+    return _recorded(blocks_of(node, block_size), key)
+
+
 class Track(ABC):
     """Abstract base class for Tracks:\n
     A track is an iterator of samples."""
@@ -18,93 +382,179 @@ class Track(ABC):
 
     def __iter__(self):
         ...
+
+    def iter_blocks(self, block_size: int = BLOCK_SIZE) -> Iterator[np.ndarray]:
+        """the samples as arrays of `block_size` (only the last one may be shorter)"""
+        ...
     
     def to_audio(self) -> AudioData:
         ...
 
+    def key(self) -> Hashable:
+        """see `structural_key`"""
+        raise Unkeyable(self)
+
 
 class IterationObject(ABC):
+    """A node of the track graph\n
+    produces samples one by one (`__iter__`) or in blocks of `block_size` (`iter_blocks`)\n
+    a node only holds parameters, every iteration gets a new cursor (iterator)
+    with its own state, so a graph can be rendered any number of times"""
     @property
     def typus(self) -> str:
         return self.__class__.__name__
 
+    def iter_blocks(self, block_size: int) -> Iterator[np.ndarray]:
+        """fallback for nodes without a block implementation"""
+        return buffered_blocks(self, block_size)
+
+    def length(self) -> int | None:
+        """number of samples, None if unknown (see `length_of`)"""
+        return None
+
+    def key(self) -> Hashable:
+        """see `structural_key`"""
+        return (self.typus, *(freeze(getattr(self, f.name)) for f in fields(self)))
+
 
 @dataclass
 class Parts(IterationObject):
     parts: list[Track]
-    _part_iter = None
 
-    def then(self, track: Track) -> None:
+    def then(self, track: Track) -> Self:
         assert track is not None
-        self.parts.append(track)
+        return Parts([*self.parts, track])
     
     # ==================
-    def _stop_if_empty(self):
-        if len(self.parts):
-            return
-        # was ist, wenn __iter__ aufgerufen wird, aber _part_iter nicht leer ist?
-        raise StopIteration("Parts object is empty!")
-
     def __iter__(self):
-        if not len(self.parts):
-            self._part_iter = iter([])
-        else:
-            first_part = self.parts.pop(0)
-            self._part_iter = iter(first_part)
-        return self
-    
-    def __next__(self) -> float:
-        try:
-            return next(self._part_iter)
-        except StopIteration:
-            self._stop_if_empty()
-            first_part = self.parts.pop(0)
-            self._part_iter = iter(first_part)
-            return next(self)
+        return chain.from_iterable(self.parts)
 
-iteration = 0
+    def iter_blocks(self, block_size: int) -> Iterator[np.ndarray]:
+        return self.iter_blocks_from(0, block_size)
+
+    def _part_blocks_from(self, start: int, block_size: int) -> Iterator[np.ndarray]:
+        for part in self.parts:
+            if start <= 0:
+                yield from memo_blocks(part, 0, block_size)
+                continue
+            length = length_of(part)
+            if length is None:
+                # find out how long the part is by rendering it
+                for block in memo_blocks(part, 0, block_size):
+                    if start < len(block):
+                        yield block[max(start, 0):]
+                    start -= len(block)
+                continue
+            if start < length:
+                yield from memo_blocks(part, start, block_size)
+            start -= length
+
+    def iter_blocks_from(self, start: int, block_size: int) -> Iterator[np.ndarray]:
+        """skips the parts before `start` by their lengths"""
+        return rechunk(self._part_blocks_from(start, block_size), block_size)
+
+    def length(self) -> int | None:
+        lengths = [length_of(part) for part in self.parts]
+        return None if None in lengths else sum(lengths)
 
 @dataclass
 class Addition(IterationObject):
+    """Timeline mixer: part i starts at sample offsets[i] (missing offsets are 0)\n
+    parts wait in a heap ordered by their start until they start sounding,
+    so a sample only costs as much as the parts sounding at that time"""
     parts: list[Track]
-    _to_be_removed = []
+    offsets: list[int] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.offsets = list(self.offsets) + [0] * (len(self.parts) - len(self.offsets))
 
-    def add(self, track: Track):
-        """vielleicht später noch Gewichtung hinzufügen
+    def add(self, track: Track, offset: int = 0) -> Self:
+        """offset: start in samples\n
+        vielleicht später noch Gewichtung hinzufügen
         (oder auch nicht, man kann ja auch vorher die Lautstärke anpassen)"""
-        self.parts.append(track)
+        return Addition([*self.parts, track], [*self.offsets, offset])
     
     # ==================    
-    def _stop_if_empty(self):
-        if len(self.parts):
-            return
-        # was ist, wenn __iter__ aufgerufen wird, aber _part_iter nicht leer ist?
-        raise StopIteration("Parts object is empty!")
-    
+    def _pending(self) -> list[tuple[int, int]]:
+        """heap of (start sample, part index)"""
+        pending = [(offset, i) for i, offset in enumerate(self.offsets)]
+        heapify(pending)
+        return pending
+
+    @staticmethod
+    def _start_parts_until(pending: list[tuple[int, int]], sample: int) -> Iterator[tuple[int, int]]:
+        """pops the parts starting before `sample` from the heap"""
+        while pending and pending[0][0] < sample:
+            yield heappop(pending)
+
     def __iter__(self):
-        for part in self.parts:
-            iter(part)
-        return self
-    
-    def _res_from(self, part: Track) -> float:
-        try:
-            return next(part)
-        except StopIteration:
-            self._to_be_removed.append(part)
-            return 0
-        
-    def _remove_stopped_parts(self):
-        for part in self._to_be_removed:
-            self.parts.remove(part)
-        self._to_be_removed = []
-    
-    def __next__(self) -> float:
-        self._stop_if_empty()
+        return self._samples()
+
+    def _samples(self) -> Iterator[float]:
+        pending = self._pending()
+        # part index -> iterator, of the parts sounding right now
+        active = {}
+        sample = 0
+        while True:
+            for _, i in self._start_parts_until(pending, sample + 1):
+                active[i] = iter(self.parts[i])
+            if not active and not pending:
+                return
+
+            res = 0
+            for i, part in list(active.items()):
+                try:
+                    res += next(part)
+                except StopIteration:
+                    del active[i]
+            sample += 1
+            if not active and not pending:
+                # every part ended with the previous sample
+                return
+            yield res
+
+    def iter_blocks(self, block_size: int) -> Iterator[np.ndarray]:
+        return self.iter_blocks_from(0, block_size)
+
+    def iter_blocks_from(self, start: int, block_size: int) -> Iterator[np.ndarray]:
+        pending = self._pending()
+        # part index -> blocks, of the parts sounding right now
+        active = {}
+        # parts that started before `start` seek, parts that are over by then are left out
+        for offset, i in self._start_parts_until(pending, start):
+            length = length_of(self.parts[i])
+            if length is None or offset + length > start:
+                active[i] = memo_blocks(self.parts[i], start - offset, block_size)
+        while active or pending:
+            for offset, i in self._start_parts_until(pending, start + block_size):
+                # leading silence, so that the blocks of the part line up with the output
+                lead = np.zeros(offset - start)
+                blocks = chain([lead], memo_blocks(self.parts[i], 0, block_size))
+                active[i] = rechunk(blocks, block_size)
 
-        res = sum(self._res_from(part) for part in self.parts)
-        self._remove_stopped_parts()
+            out = np.zeros(block_size)
+            longest = 0
+            for i, blocks in list(active.items()):
+                block = next(blocks, None)
+                if block is None or len(block) < block_size:
+                    # a short block is the last one
+                    del active[i]
+                if block is None:
+                    continue
+                out[:len(block)] += block
+                longest = max(longest, len(block))
+            start += block_size
+            if pending:
+                # silence until the next part starts
+                yield out
+            elif longest:
+                yield out[:longest]
 
-        return res
+    def length(self) -> int | None:
+        lengths = [length_of(part) for part in self.parts]
+        if None in lengths:
+            return None
+        return max((offset + length for offset, length in zip(self.offsets, lengths)), default=0)
 
 
 @dataclass
@@ -114,95 +564,375 @@ class Multiply(IterationObject):
 
     # ==================    
     def __iter__(self):
-        iter(self.track)
-        return self
-    
-    def __next__(self):
-        ret = next(self.track) * self.factor
-        return clamp(ret, -1, 1)
+        return (clamp(x * self.factor, -1, 1) for x in self.track)
+
+    def iter_blocks(self, block_size: int) -> Iterator[np.ndarray]:
+        return self.iter_blocks_from(0, block_size)
+
+    def iter_blocks_from(self, start: int, block_size: int) -> Iterator[np.ndarray]:
+        for block in blocks_from(self.track, start, block_size):
+            yield np.clip(block * self.factor, -1, 1)
+
+    def length(self) -> int | None:
+        return length_of(self.track)
 
 
 @dataclass
 class MultiplyFunction(IterationObject):
-    """factor_fun: (t) -> [-1, 1]"""
+    """factor_fun: (t) -> [-1, 1]\n
+    vectorized: factor_fun also takes an array of times (and returns an array of factors)"""
     track: Track
     factor_fun: Callable[[float], float]
     sample_rate: int = 48000
-    _time = 0
-    _dt = 0
+    vectorized: bool = False
 
     # ==================    
     def __iter__(self):
-        iter(self.track)
-        self._dt = 1 / self.sample_rate
-        return self
-    
-    def __next__(self) -> float:
-        factor = self.factor_fun(self._time)
-        self._time += self._dt
-        ret = next(self.track) * factor
-        return clamp(ret, -1, 1)
+        return (
+            clamp(x * self.factor_fun(i / self.sample_rate), -1, 1)
+            for i, x in enumerate(self.track)
+        )
+
+    def factors(self, times: np.ndarray) -> np.ndarray:
+        if self.vectorized:
+            return np.broadcast_to(self.factor_fun(times), times.shape)
+        return np.fromiter(map(self.factor_fun, times.tolist()), np.float64, len(times))
+
+    def iter_blocks(self, block_size: int) -> Iterator[np.ndarray]:
+        return self.iter_blocks_from(0, block_size)
+
+    def iter_blocks_from(self, start: int, block_size: int) -> Iterator[np.ndarray]:
+        for block in blocks_from(self.track, start, block_size):
+            times = np.arange(start, start + len(block)) / self.sample_rate
+            start += len(block)
+            yield np.clip(block * self.factors(times), -1, 1)
+
+    def length(self) -> int | None:
+        return length_of(self.track)
     
 
+@dataclass
+class FusedGain(IterationObject):
+    """Chain of Multiply and MultiplyFunction nodes fused into one (see `optimize_graph`)\n
+    clamp(x * gain(t), -1, 1) * post_gain(t), where gain(t) = factor * factor_fun_1(t) * ...\n
+    factor_funs, post_funs: pairs of (factor_fun, vectorized)\n
+    the post gain is never above 1 in magnitude, so the result stays in [-1, 1] without another clamp"""
+    track: Track | IterationObject
+    factor: float = 1
+    factor_funs: list[tuple[Callable[[float], float], bool]] = field(default_factory=list)
+    post_factor: float = 1
+    post_funs: list[tuple[Callable[[float], float], bool]] = field(default_factory=list)
+    sample_rate: int = 48000
+
+    # ==================
+    def __iter__(self):
+        return self._samples()
+
+    def _samples(self) -> Iterator[float]:
+        for i, x in enumerate(self.track):
+            t = i / self.sample_rate
+            ret = x * self.factor
+            for factor_fun, _ in self.factor_funs:
+                ret *= factor_fun(t)
+            ret = clamp(ret, -1, 1) * self.post_factor
+            for factor_fun, _ in self.post_funs:
+                ret *= factor_fun(t)
+            yield ret
+
+    def _gain(self, factor: float, factor_funs: list, times: np.ndarray) -> np.ndarray | float:
+        for factor_fun, vectorized in factor_funs:
+            factor = factor * MultiplyFunction(None, factor_fun, vectorized=vectorized).factors(times)
+        return factor
+
+    def iter_blocks(self, block_size: int) -> Iterator[np.ndarray]:
+        return self.iter_blocks_from(0, block_size)
+
+    def iter_blocks_from(self, start: int, block_size: int) -> Iterator[np.ndarray]:
+        for block in blocks_from(self.track, start, block_size):
+            times = np.arange(start, start + len(block)) / self.sample_rate
+            start += len(block)
+            block = np.clip(block * self._gain(self.factor, self.factor_funs, times), -1, 1)
+            if self.post_factor != 1 or self.post_funs:
+                block = block * self._gain(self.post_factor, self.post_funs, times)
+            yield block
+
+    def length(self) -> int | None:
+        return length_of(self.track)
+
+
 @dataclass
 class Dur(IterationObject):
     track: Track
     stop: float
     start: float = 0
     sample_rate: int = 48000
-    _stop_iteration = 0
-    _iteration = 0
 
     # ==================
     def __iter__(self):
-        iter(self.track)
-        self._stop_iteration = self.sample_rate * (self.stop - self.start)
-        for _ in range(self.sample_rate * self.start):
-            print("bana")
-            next(self.track)
-        return self
+        skip_n = int(self.sample_rate * self.start)
+        left_n = int(self.sample_rate * (self.stop - self.start))
+        return (clamp(x, -1, 1) for x in islice(self.track, skip_n, skip_n + max(left_n, 0)))
+
+    def iter_blocks(self, block_size: int) -> Iterator[np.ndarray]:
+        return self.iter_blocks_from(0, block_size)
+
+    def iter_blocks_from(self, start: int, block_size: int) -> Iterator[np.ndarray]:
+        skip_n = int(self.sample_rate * self.start) + start
+        left_n = int(self.sample_rate * (self.stop - self.start)) - start
+        blocks = take_samples(blocks_from(self.track, skip_n, block_size), left_n)
+        return (np.clip(block, -1, 1) for block in blocks)
+
+    def length(self) -> int | None:
+        length = length_of(self.track)
+        if length is None:
+            return None
+        skip_n = int(self.sample_rate * self.start)
+        return max(min(int(self.sample_rate * (self.stop - self.start)), length - skip_n), 0)
+
+
+@dataclass
+class Resample(IterationObject):
+    """Converts the sample rate of the track, `block_size` samples at a time"""
+    track: Track | IterationObject
+    from_rate: int
+    to_rate: int
+    block_size: int = 4096
+
+    def __iter__(self):
+        return self._resampled()
+
+    def _resampled(self) -> Iterator[float]:
+        it = iter(self.track)
+        resampler = Resampler(self.from_rate, self.to_rate)
+        while len(block := np.fromiter(islice(it, self.block_size), np.float64)):
+            yield from resampler.process(block).tolist()
+        yield from resampler.flush().tolist()
+
+    def iter_blocks(self, block_size: int) -> Iterator[np.ndarray]:
+        blocks = blocks_of(self.track, block_size)
+        return rechunk(resample_blocks(blocks, self.from_rate, self.to_rate), block_size)
 
-    def __next__(self) -> float:
-        print("Bulwu")
-        if self._iteration >= self._stop_iteration:
-            print("Stop")
-            raise StopIteration("Duration over!")
-        ret = next(self.track)
-        print(ret)
-        self._iteration += 1
-        return clamp(ret, -1, 1)
+    def length(self) -> int | None:
+        length = length_of(self.track)
+        return None if length is None else -(-length * self.to_rate // self.from_rate)
 
 
 @dataclass
 class FromIterator(IterationObject):
-    """Intermediate object, so that MonoTracks can source from Iterators"""
+    """Intermediate object, so that MonoTracks can source from Iterators\n
+    closed form iterators (`sound_generator.ClosedFormWave`) start over for every iteration,
+    any other iterator can only be iterated once (see `FromFactory`)"""
     it: Iterator
 
     def __iter__(self):
-        return self
+        if isinstance(self.it, ClosedFormWave):
+            return self.it.fresh()
+        return self.it
+
+    @staticmethod
+    def _read_blocks(wave: ClosedFormWave, block_size: int) -> Iterator[np.ndarray]:
+        while len(block := wave.read(block_size)):
+            yield block
+
+    def iter_blocks(self, block_size: int) -> Iterator[np.ndarray]:
+        return self.iter_blocks_from(0, block_size)
+
+    def iter_blocks_from(self, start: int, block_size: int) -> Iterator[np.ndarray]:
+        """closed form iterators (`sound_generator.ClosedFormWave`) jump to `start` directly
+        and are computed a block at a time"""
+        if isinstance(self.it, ClosedFormWave):
+            wave = self.it.fresh()
+            wave.skip(start)
+            return self._read_blocks(wave, block_size)
+        return buffered_blocks(islice(self.it, start, None), block_size)
+
+    def length(self) -> int | None:
+        return len(self.it) if hasattr(self.it, "__len__") else None
+
+    def key(self) -> Hashable:
+        if not isinstance(self.it, ClosedFormWave):
+            # a one-shot iterator doesn't render the same twice
+            raise Unkeyable(self.it)
+        return (self.typus, self.it.key())
+
+
+@dataclass
+class FromFactory(IterationObject):
+    """Sources from a new iterator `factory()` for every iteration\n
+    (e.g. `functools.partial(generator_function, *args)`), so the node can be iterated any number of times"""
+    factory: Callable[[], Iterator[float]]
+
+    def __iter__(self):
+        return iter(self.factory())
+
+    def iter_blocks(self, block_size: int) -> Iterator[np.ndarray]:
+        return FromIterator(self.factory()).iter_blocks(block_size)
 
-    def __next__(self) -> float:
-        return next(self.it)
+    def iter_blocks_from(self, start: int, block_size: int) -> Iterator[np.ndarray]:
+        return FromIterator(self.factory()).iter_blocks_from(start, block_size)
 
 
 @dataclass
 class FromList(IterationObject):
     lis: list
-    _iterator = None
 
     def __iter__(self):
-        self._iterator = iter(self.lis)
-        return self
+        return iter(self.lis)
+
+    def iter_blocks(self, block_size: int) -> Iterator[np.ndarray]:
+        return self.iter_blocks_from(0, block_size)
+
+    def iter_blocks_from(self, start: int, block_size: int) -> Iterator[np.ndarray]:
+        values = np.asarray(self.lis, dtype=np.float64)
+        for start in range(start, len(values), block_size):
+            yield values[start: start + block_size]
+
+    def length(self) -> int | None:
+        return len(self.lis)
+
+    def key(self) -> Hashable:
+        return (self.typus, array_digest(self.lis))
+
+
+@dataclass
+class FromChannel(IterationObject):
+    """One channel of AudioData, converted to floats a block at a time\n
+    (so a memory-mapped file is only read as far as it is rendered)"""
+    audio_data: AudioData
+    channel_index: int = 0
+
+    def __iter__(self):
+        return channel_intervals(self.audio_data, self.channel_index)
+
+    def iter_blocks(self, block_size: int) -> Iterator[np.ndarray]:
+        return self.iter_blocks_from(0, block_size)
+
+    def iter_blocks_from(self, start: int, block_size: int) -> Iterator[np.ndarray]:
+        channel = self.audio_data.channel(self.channel_index)
+        for start in range(start, len(channel), block_size):
+            yield samples_to_intervals(channel[start: start + block_size], self.audio_data.byte_p_sample, self.audio_data.audio_fmt)
 
-    def __next__(self) -> float:
-        return next(self._iterator)
+    def length(self) -> int | None:
+        return len(self.audio_data.channel(self.channel_index))
+
+    def key(self) -> Hashable:
+        """digest of the raw samples, hashed in chunks (like they are read)"""
+        channel = self.audio_data.channel(self.channel_index)
+        digest = sha1()
+        for start in range(0, len(channel), 1 << 16):
+            digest.update(np.ascontiguousarray(channel[start: start + (1 << 16)]).tobytes())
+        return (self.typus, self.audio_data.byte_p_sample, self.audio_data.audio_fmt, len(channel), digest.hexdigest())
     
 
+# Graph optimizer ======
+@dataclass
+class OptimizeReport:
+    nodes_before: int
+    nodes_after: int
+
+def child_nodes(node) -> list:
+    if isinstance(node, MonoTrack):
+        return [node.obj]
+    if isinstance(node, (Parts, Addition)):
+        return list(node.parts)
+    if isinstance(node, (Multiply, MultiplyFunction, FusedGain, Dur, Resample)):
+        return [node.track]
+    return []
+
+def count_nodes(node) -> int:
+    return 1 + sum(count_nodes(child) for child in child_nodes(node))
+
+def _gain_stage(node) -> tuple[float, list, int] | None:
+    """(factor, factor_funs, sample_rate) of a Multiply or MultiplyFunction node"""
+    if isinstance(node, Multiply):
+        return node.factor, [], None
+    if isinstance(node, MultiplyFunction):
+        return 1, [(node.factor_fun, node.vectorized)], node.sample_rate
+    return None
+
+def _gain_peak(factor: float, factor_funs: list) -> float | None:
+    """an upper bound of |factor * factor_funs|, None if a factor_fun isn't an `envelope.Envelope`
+    (an arbitrary function can return anything)"""
+    peak = abs(factor)
+    for factor_fun, _ in factor_funs:
+        if isinstance(factor_fun, KeyedFunction):
+            factor_fun = factor_fun.fun
+        if not isinstance(factor_fun, Envelope):
+            return None
+        peak *= factor_fun.peak()
+    return peak
+
+def _fused(inner, factor: float, factor_funs: list, sample_rate: int | None) -> FusedGain:
+    """inner * factor * factor_funs, clamped"""
+    if isinstance(inner, FusedGain) and (sample_rate is None or sample_rate == inner.sample_rate
+            or not (inner.factor_funs or inner.post_funs)):
+        sample_rate = inner.sample_rate if sample_rate is None else sample_rate
+        peak = _gain_peak(factor, factor_funs)
+        if peak is not None and peak <= 1:
+            # the inner result is clamped already and the gain stays in [-1, 1]
+            # -> the product stays in [-1, 1], the clamp is redundant
+            return FusedGain(
+                inner.track, inner.factor, inner.factor_funs,
+                inner.post_factor * factor, inner.post_funs + factor_funs, sample_rate
+            )
+        if not factor_funs and inner.post_factor == 1 and not inner.post_funs:
+            # clamp(f * clamp(x)) == clamp(f * x) for |f| >= 1
+            return FusedGain(inner.track, inner.factor * factor, inner.factor_funs, sample_rate=sample_rate)
+    return FusedGain(inner, factor, factor_funs, sample_rate=sample_rate or 48000)
+
+def _optimized(node):
+    if isinstance(node, MonoTrack):
+        # the MonoTrack wrapper itself does nothing while rendering
+        return _optimized(node.obj)
+
+    if isinstance(node, Parts):
+        parts = []
+        for part in node.parts:
+            part = _optimized(part)
+            # nested Parts play one after the other anyway
+            parts += part.parts if isinstance(part, Parts) else [part]
+        return parts[0] if len(parts) == 1 else Parts(parts)
+
+    if isinstance(node, Addition):
+        parts = [_optimized(part) for part in node.parts]
+        if len(parts) == 1 and node.offsets[0] == 0:
+            return parts[0]
+        return Addition(parts, list(node.offsets))
+
+    stage = _gain_stage(node)
+    if stage is not None:
+        gain = _fused(_optimized(node.track), *stage)
+        if not gain.factor_funs and not gain.post_funs and isinstance(gain.track, FromList):
+            # fold the constant factors into the values
+            values = np.asarray(gain.track.lis, dtype=np.float64)
+            return FromList(np.clip(values * gain.factor, -1, 1) * gain.post_factor)
+        return gain
+
+    if isinstance(node, Dur):
+        return Dur(_optimized(node.track), node.stop, node.start, node.sample_rate)
+    if isinstance(node, Resample):
+        return Resample(_optimized(node.track), node.from_rate, node.to_rate, node.block_size)
+    return node
+
+def optimize_graph(node) -> tuple[IterationObject, OptimizeReport]:
+    """Compiles a track graph into an equivalent one with fewer nodes:\n
+    - chains of Multiply/MultiplyFunction are fused into one FusedGain, constant factors are folded\n
+    - clamps that provably can't change the result are dropped
+    (after constant factors and envelopes of at most 1 in magnitude, never after other functions)\n
+    - Parts/Addition with a single child collapse to the child, nested Parts are flattened\n
+    - MonoTrack wrappers inside the graph are dropped\n
+    the original nodes are left untouched"""
+    before = count_nodes(node)
+    optimized = _optimized(node)
+    return optimized, OptimizeReport(before, count_nodes(optimized))
+
+
 class MonoTrack(Track):
     def __init__(self, sample_rate: int = 48000):
         self.sample_rate = sample_rate
         self.obj: IterationObject = Parts([])
-        self._iterator = None
+        # filled by `to_audio(profile=True)`
+        self.last_profile: RenderProfile | None = None
     
     @classmethod
     def from_obj(cls, obj: IterationObject, sample_rate: int = 48000) -> Self:
@@ -214,6 +944,11 @@ class MonoTrack(Track):
     def from_iter(cls, iterator: Iterator[float], sample_rate: int = 48000) -> Self:
         return cls.from_obj(FromIterator(iterator), sample_rate)
     
+    @classmethod
+    def from_factory(cls, factory: Callable[[], Iterator[float]], sample_rate: int = 48000) -> Self:
+        """factory: makes a new iterator for every rendering (see `FromFactory`)"""
+        return cls.from_obj(FromFactory(factory), sample_rate)
+
     @classmethod
     def from_list(cls, lis: list[float], sample_rate: int = 48000) -> Self:
         return cls.from_obj(FromList(lis), sample_rate)
@@ -224,33 +959,39 @@ class MonoTrack(Track):
         return cls.from_iter(it, sample_rate)
     
     @classmethod
-    def from_audio_data(cls, audio_data: AudioData, *, channel_index: int = 0, sample_rate: int = 48000) -> Self:
-        return cls.from_audio_blocs(audio_data.blocs, channel_index=channel_index, sample_rate=sample_rate)
+    def from_audio_data(cls, audio_data: AudioData, *, channel_index: int = 0, sample_rate: int | None = None) -> Self:
+        """sample_rate: resamples to that rate if it differs from the file's"""
+        mtr = cls.from_obj(FromChannel(audio_data, channel_index), audio_data.sample_rate)
+        return mtr if sample_rate is None else mtr.resample(sample_rate)
     
     # ==================
-    def adsr(self, a: float, d: float, s: float, r: float, *, hit_time: float) -> Self:
-        def asdr_fun(t: float):
-            if t < a:
-                return t/a
-            if t < a+d:
-                x = (t-a)/d
-                return 1 - x*(1-s)
-            if t < hit_time:
-                return s
-            if t < hit_time + r:
-                x = (t-hit_time)/r
-                return (1-x)*s
-            return 0
-
-        return self.mul_func(asdr_fun)
+    def adsr(
+            self,
+            a: float | ADSR,
+            d: float | None = None,
+            s: float | None = None,
+            r: float | None = None, *,
+            hit_time: float | None = None
+        ) -> Self:
+        """a: attack time, or a whole `envelope.ADSR` (without the other arguments)"""
+        if isinstance(a, ADSR):
+            return self.mul_func(a)
+        assert None not in (d, s, r, hit_time)
+        return self.mul_func(ADSR(a, d, s, r, hit_time))
+
+    def _matched(self, other: Track) -> Track:
+        """`other` at the sample rate of this track (resampled if it differs, `other` itself stays as it is)"""
+        if other.sample_rate == self.sample_rate:
+            return other
+        return MonoTrack.from_obj(Resample(other, other.sample_rate, self.sample_rate), self.sample_rate)
 
     def then(self, other: Self) -> Self:
+        """plays `other` afterwards (resampled to the rate of this track if it differs)"""
+        other = self._matched(other)
         if self.obj.typus == "Parts":
-            self.obj.then(other)
+            self.obj = self.obj.then(other)
         else:
-            new_obj = Parts([self.obj])
-            new_obj.then(other)
-            self.obj = new_obj
+            self.obj = Parts([self.obj, other])
         return self
 
     def then_iter(self, iterator: Iterator[float], sample_rate = 48000) -> Self:
@@ -258,19 +999,19 @@ class MonoTrack(Track):
         return self.then(mtr)
 
     def add(self, other: Self, *, offset_t: float = 0) -> Self:
-        silence = (0 for _ in range(int(other.sample_rate * offset_t)))
-        obj = other if offset_t == 0 else MonoTrack.from_iter(silence).then(other)
+        """mixes `other` in, starting `offset_t` seconds in (resampled to the rate of this track if it differs)"""
+        other = self._matched(other)
+        offset = int(self.sample_rate * offset_t)
         if self.obj.typus == "Addition":
-            self.obj.add(obj)
+            self.obj = self.obj.add(other, offset)
         else:
-            new_obj = Addition([self.obj, obj])
-            self.obj = new_obj
+            self.obj = Addition([self.obj, other], [0, offset])
         return self
     
     def mul(self, factor: float) -> Self:
         """multiplies the volume of the track"""
         if self.obj.typus == "Multiply":
-            self.obj.factor *= factor
+            self.obj = Multiply(self.obj.track, self.obj.factor * factor)
         else:
             self.obj = Multiply(self.obj, factor)
         return self
@@ -289,82 +1030,260 @@ class MonoTrack(Track):
         """Applies a musical modifier"""
         pass
 
-    def mul_func(self, factor_fun: Callable[[float], float]) -> Self:
-        self.obj = MultiplyFunction(self.obj, factor_fun, sample_rate=self.sample_rate)
+    def resample(self, sample_rate: int) -> Self:
+        """converts the track to another sample rate (keeping its duration and pitch)"""
+        if sample_rate != self.sample_rate:
+            self.obj = Resample(self.obj, self.sample_rate, sample_rate)
+            self.sample_rate = sample_rate
+        return self
+
+    def mul_func(
+            self,
+            factor_fun: Callable[[float], float], *,
+            vectorized: bool = False,
+            cache_key: Hashable | None = None
+        ) -> Self:
+        """vectorized: factor_fun also works on arrays of times (much faster in the block engine),
+        always true for an `envelope.Envelope`\n
+        cache_key: identifies factor_fun for the render cache (lambdas aren't cached without one)"""
+        vectorized = vectorized or isinstance(factor_fun, Envelope)
+        if cache_key is not None:
+            factor_fun = KeyedFunction(factor_fun, cache_key)
+        self.obj = MultiplyFunction(self.obj, factor_fun, sample_rate=self.sample_rate, vectorized=vectorized)
         return self
     
+    def optimize(self) -> OptimizeReport:
+        """Replaces the graph by its optimized version (see `optimize_graph`)"""
+        self.obj, report = optimize_graph(self.obj)
+        return report
+
     def copy(self) -> Self:
+        """the nodes are never changed after construction, so the copy can share them"""
         cop = MonoTrack(self.sample_rate)
         cop.obj = self.obj
         return cop
     
     # ==================
     def __iter__(self):
-        self._iterator = iter(self.obj)
-        return self
-    
-    def __next__(self) -> float:
-        return next(self._iterator)
+        return iter(self.obj)
+
+    def key(self) -> Hashable:
+        return self.obj.key()
+
+    def iter_blocks(self, block_size: int = BLOCK_SIZE) -> Iterator[np.ndarray]:
+        """streams the blocks (nothing is recorded into RENDER_MEMO meanwhile)"""
+        return _streamed(blocks_of(self.obj, block_size))
+
+    def iter_blocks_from(self, start: int, block_size: int = BLOCK_SIZE) -> Iterator[np.ndarray]:
+        return blocks_from(self.obj, start, block_size)
+
+    def length(self) -> int | None:
+        return length_of(self.obj)
+
+    def render(
+            self,
+            start_t: float = 0,
+            stop_t: float | None = None, *,
+            bit_p_sample: int = 16,
+            audio_fmt: int = WAVE_FORMAT_PCM,
+            block_size: int = BLOCK_SIZE,
+            optimize: bool = True
+        ) -> AudioData:
+        """Renders the section from `start_t` to `stop_t` (in seconds, None: until the end)\n
+        the nodes seek to `start_t` where they can (see `blocks_from`),
+        so that rendering a section costs about as much as the section itself"""
+        # optimizing a copy, so that `self.obj` (and with it the key of the track) stays as it was built
+        graph = optimize_graph(self.obj)[0] if optimize else self.obj
+        start = int(start_t * self.sample_rate)
+        blocks = blocks_from(graph, start, block_size)
+        if stop_t is not None:
+            blocks = take_samples(blocks, int(stop_t * self.sample_rate) - start)
+        return AudioData.from_intervals(
+            np.concatenate([np.zeros(0), *blocks]),
+            channels=1,
+            sample_rate=self.sample_rate,
+            bit_p_sample=bit_p_sample,
+            audio_fmt=audio_fmt
+        )
     
-    def to_audio(self) -> AudioData:
-        blocs = [(interval_to_int(sample),) for sample in self.obj]
-        return AudioData.from_blocs(blocs, channels=1, sample_rate=self.sample_rate)
+    def to_audio(
+            self, *,
+            bit_p_sample: int = 16,
+            audio_fmt: int = WAVE_FORMAT_PCM,
+            block_size: int = BLOCK_SIZE,
+            blockwise: bool = True,
+            optimize: bool = True,
+            workers: int | None = 1,
+            time_sliced: bool = False,
+            profile: bool = False
+        ) -> AudioData:
+        """audio_fmt 3 (IEEE float) keeps the samples unquantized\n
+        blockwise: render with the block engine, else sample by sample\n
+        optimize: compile (a copy of) the graph before rendering (see `optimize_graph`), the track stays as it is\n
+        workers: processes mixing the parts of the top Addition (None: one per core, 1: no processes),
+        see `parallel.render_addition`\n
+        time_sliced: the workers render segments of the time instead (also for a single long voice),
+        equal to the serial render within floating-point tolerance, see `parallel.render_sliced`\n
+        profile: time every node of the block engine (in this process), the result goes to `last_profile`,
+        the graph is rendered as it was built then (not optimized), so that the profile tree matches it"""
+        # imported here, as parallel imports this module
+        from .parallel import can_render_parallel, can_render_sliced, parallel_graph, render_sliced
+
+        graph = optimize_graph(self.obj)[0] if optimize and not (profile and blockwise) else self.obj
+        if profile and blockwise:
+            with profiling(self.sample_rate) as self.last_profile:
+                values = np.concatenate([np.zeros(0), *blocks_of(graph, block_size)])
+        elif blockwise and workers != 1 and time_sliced and can_render_sliced(graph):
+            values = render_sliced(graph, workers=workers, block_size=block_size)
+        elif blockwise and workers != 1 and can_render_parallel(graph):
+            graph = parallel_graph(graph, workers=workers, block_size=block_size)
+            values = np.concatenate([np.zeros(0), *blocks_of(graph, block_size)])
+        elif blockwise:
+            values = np.concatenate([np.zeros(0), *blocks_of(graph, block_size)])
+        else:
+            values = np.fromiter(graph, np.float64)
+        return AudioData.from_intervals(
+            values,
+            channels=1,
+            sample_rate=self.sample_rate,
+            bit_p_sample=bit_p_sample,
+            audio_fmt=audio_fmt
+        )
+
+    def play(self, sink: Sink | None = None, *, buffer_size: int = 1024, queue_size: int = 4) -> PlaybackStats:
+        """Plays the track while it is being rendered (see `player.StreamPlayer`)\n
+        sink: defaults to the sound card (`PyAudioSink`)"""
+        player = StreamPlayer(
+            PyAudioSink() if sink is None else sink,
+            channels=1,
+            sample_rate=self.sample_rate,
+            buffer_size=buffer_size,
+            queue_size=queue_size
+        )
+        return player.play_buffers(self.iter_blocks(buffer_size))
+
+    def save(
+            self,
+            filename: str, *,
+            chunk_size: int = 4096,
+            bit_p_sample: int = 16,
+            audio_fmt: int = WAVE_FORMAT_PCM
+        ) -> int:
+        """Renders the track straight into a WAV file, `chunk_size` samples at a time\n
+        (constant memory, unlike `to_audio().save(...)`)\n
+        returns the number of samples written"""
+        byte_p_sample = (bit_p_sample + 7) >> 3
+        with WavStreamWriter(
+            filename,
+            channels=1,
+            sample_rate=self.sample_rate,
+            bit_p_sample=bit_p_sample,
+            audio_fmt=audio_fmt
+        ) as stream:
+            for chunk in self.iter_blocks(chunk_size):
+                stream.write_samples(intervals_to_samples(chunk, byte_p_sample, audio_fmt))
+        return stream.bloc_n
 
 
 class FrozenMonoTrack(Track):
     """In this case, the track is not a dynamic iterator, but already fully known.\n
-    helpful for multiple use, for example for a snippet of audio"""
-    def __init__(self, track: MonoTrack, sample_rate: int = 48000):
+    helpful for multiple use, for example for a snippet of audio\n
+    the samples are kept in one contiguous float32/float64 array (`track`),
+    snippets (`slice_samples`, `slice_t`) are views into it"""
+    def __init__(self, track: MonoTrack, sample_rate: int = 48000, *, dtype: np.dtype = np.float64):
         self.sample_rate = sample_rate
-        self.track = list(track)
-        self.dur = len(self.track) / sample_rate
+        self.track = np.concatenate([np.zeros(0, dtype), *blocks_of(track, BLOCK_SIZE)], dtype=dtype)
 
     @classmethod
     def from_iter(cls, iterator: Iterator[float], sample_rate: int = 48000) -> Self:
-        # return cls.from_obj(FromIterator(iterator), sample_rate)
-        pass
-
-    @classmethod
-    def from_iter(cls, iterator: Iterator[float], sample_rate: int = 48000) -> Self:
-        return cls(MonoTrack.from_obj(FromIterator(iterator), sample_rate))
+        return cls(MonoTrack.from_obj(FromIterator(iterator), sample_rate), sample_rate)
 
     @classmethod
-    def from_list(cls, lis: list[float], sample_rate: int = 48000) -> Self:
-        obj = cls(MonoTrack(), sample_rate)
-        obj.track = lis
-        obj.dur = len(obj.track) / obj.sample_rate
+    def from_list(cls, lis: list[float] | np.ndarray, sample_rate: int = 48000, *, dtype: np.dtype | None = None) -> Self:
+        """float32 and float64 arrays (also memory-mapped ones) are used without copying\n
+        dtype: float32 halves the memory, default: float64 (or the dtype of the array)"""
+        obj = cls.__new__(cls)
+        obj.sample_rate = sample_rate
+        obj.track = _float_buffer(lis, dtype)
         return obj
 
     @classmethod
     def from_audio_blocs(cls, int_blocs: list[tuple[int]], *, channel_index: int = 0, sample_rate: int = 48000) -> Self:
-        lis = [int_to_interval(bloc[channel_index]) for bloc in int_blocs]
-        return cls.from_list(lis, sample_rate)
+        ints = np.array([bloc[channel_index] for bloc in int_blocs], dtype=np.int64)
+        return cls.from_list(ints / (1 << 15), sample_rate)
 
     @classmethod
-    def from_audio_data(cls, audio_data: AudioData, *, channel_index: int = 0, sample_rate: int = 48000) -> Self:
-        return cls.from_audio_blocs(audio_data.blocs, channel_index=channel_index, sample_rate=sample_rate)
+    def from_audio_data(
+            cls,
+            audio_data: AudioData, *,
+            channel_index: int = 0,
+            sample_rate: int | None = None,
+            dtype: np.dtype | None = None
+        ) -> Self:
+        """sample_rate: resamples to that rate if it differs from the file's"""
+        channel = audio_data.channel(channel_index)
+        lis = samples_to_intervals(channel, audio_data.byte_p_sample, audio_data.audio_fmt)
+        if sample_rate is None:
+            return cls.from_list(lis, audio_data.sample_rate, dtype=dtype)
+        return cls.from_list(resample(lis, audio_data.sample_rate, sample_rate), sample_rate, dtype=dtype)
+
+    # ==================
+    def slice_samples(self, start: int, stop: int | None = None) -> Self:
+        """the snippet from sample `start` to `stop` (a view, nothing is copied)"""
+        return FrozenMonoTrack.from_list(self.track[start: stop], self.sample_rate)
+
+    def slice_t(self, start_t: float, stop_t: float | None = None) -> Self:
+        """the snippet from `start_t` to `stop_t` (in seconds)"""
+        stop = None if stop_t is None else int(stop_t * self.sample_rate)
+        return self.slice_samples(int(start_t * self.sample_rate), stop)
 
     # ==================
     def __iter__(self):
-        return iter(self.track)
+        return chain.from_iterable(block.tolist() for block in self.iter_blocks())
+
+    def iter_blocks(self, block_size: int = BLOCK_SIZE) -> Iterator[np.ndarray]:
+        return self.iter_blocks_from(0, block_size)
+
+    def iter_blocks_from(self, start: int, block_size: int = BLOCK_SIZE) -> Iterator[np.ndarray]:
+        for start in range(start, len(self.track), block_size):
+            yield self.track[start: start + block_size].astype(np.float64, copy=False)
+
+    def length(self) -> int | None:
+        return self.sample_n
+
+    def key(self) -> Hashable:
+        return ("FrozenMonoTrack", array_digest(self.track))
     
-    def to_audio(self) -> AudioData:
-        blocs = [(interval_to_int(sample),) for sample in self.track]
-        return AudioData.from_blocs(blocs, channels=1, sample_rate=self.sample_rate)
+    def to_audio(self, *, bit_p_sample: int = 16, audio_fmt: int = WAVE_FORMAT_PCM) -> AudioData:
+        return AudioData.from_intervals(
+            self.track,
+            channels=1,
+            sample_rate=self.sample_rate,
+            bit_p_sample=bit_p_sample,
+            audio_fmt=audio_fmt
+        )
 
     # ==================
     @property
     def sample_n(self) -> int:
         return len(self.track)
 
+    @property
+    def dur(self) -> float:
+        return self.sample_n / self.sample_rate
+
+
+def _float_buffer(values, dtype: np.dtype | None) -> np.ndarray:
+    values = np.asarray(values)
+    if dtype is None:
+        dtype = values.dtype if values.dtype in (np.float32, np.float64) else np.float64
+    return np.ascontiguousarray(values.reshape(-1), dtype=dtype)
+
 # Decorator ============
 def to_mono_track(fun: Callable[..., Iterator[float]]) -> Callable[..., MonoTrack]:
     """Generates a track from a generator function"""
     def wrapper(*args, **kwargs):
-        mtr = MonoTrack()
-        it_obj = FromIterator(fun(*args, **kwargs))
-        mtr.obj = it_obj
-        return mtr
+        return MonoTrack.from_factory(partial(fun, *args, **kwargs))
     return wrapper
 
 
@@ -375,9 +1294,10 @@ class PolyTrack:
     """Für mehrspuriges Audio\n
     soll später auch Unterklasse von Track werden;\n
     `add` und `then` könnte dann aber nur mit gleich breitem Polytrack operieren"""
-    def __init__(self, mono_channels: list[MonoTrack]) -> None:
+    def __init__(self, mono_channels: list[MonoTrack], sample_rate: int = 48000) -> None:
         self.it_of_channels: Iterator[tuple[float]] = zip(*mono_channels)
         self.n = len(mono_channels)
+        self.sample_rate = sample_rate
     
     @classmethod
     def multiply_mono(cls, channel: MonoTrack, n: int) -> Self:
@@ -402,6 +1322,32 @@ class PolyTrack:
             for poly_sample in self.it_of_channels
         ]
     
-    def to_audio(self) -> AudioData:
-        return AudioData.from_blocs(self.to_audio_blocs(), channels=self.n, sample_rate=self.sample_rate)
-    
+    def to_audio(self, *, bit_p_sample: int = 16, audio_fmt: int = WAVE_FORMAT_PCM) -> AudioData:
+        return AudioData.from_intervals(
+            np.array(list(self.it_of_channels), dtype=np.float64),
+            channels=self.n,
+            sample_rate=self.sample_rate,
+            bit_p_sample=bit_p_sample,
+            audio_fmt=audio_fmt
+        )
+
+    def save(
+            self,
+            filename: str, *,
+            chunk_size: int = 4096,
+            bit_p_sample: int = 16,
+            audio_fmt: int = WAVE_FORMAT_PCM
+        ) -> int:
+        """Renders all channels straight into a WAV file, `chunk_size` blocs at a time\n
+        returns the number of blocs written"""
+        byte_p_sample = (bit_p_sample + 7) >> 3
+        with WavStreamWriter(
+            filename,
+            channels=self.n,
+            sample_rate=self.sample_rate,
+            bit_p_sample=bit_p_sample,
+            audio_fmt=audio_fmt
+        ) as stream:
+            while chunk := list(islice(self.it_of_channels, chunk_size)):
+                stream.write_samples(intervals_to_samples(chunk, byte_p_sample, audio_fmt))
+        return stream.bloc_n
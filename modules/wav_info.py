@@ -0,0 +1,142 @@
+
+"""Reading WAV metadata without touching the samples"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from os import walk
+from os.path import getsize, join
+
+from .reader import Reader
+
+# Format tags (audio_fmt)
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+# SubFormat GUID of WAVE_FORMAT_EXTENSIBLE, without the leading 2 bytes (= the actual format tag)
+SUBFORMAT_GUID_TAIL = bytes.fromhex("000000001000800000aa00389b71")
+
+
+@dataclass
+class Chunk:
+    chunk_id:   str
+    # offset of the payload (after id and size) and its size in bytes
+    offset:     int
+    size:       int
+
+
+@dataclass
+class WavInfo:
+    filename:       str
+    audio_fmt:      int
+    channels:       int
+    sample_rate:    int
+    bit_p_sample:   int
+    bloc_width:     int
+    # number of complete blocs actually in the file
+    bloc_n:         int
+    extensible:     bool
+    # every chunk in file order (e.g. fmt, LIST, bext, cue, data)
+    chunks:         list[Chunk]
+
+    @property
+    def byte_p_sample(self) -> int:
+        return self.bloc_width // self.channels
+
+    @property
+    def dur(self) -> float:
+        """duration in seconds"""
+        return self.bloc_n / self.sample_rate
+
+    def find_chunk(self, chunk_id: str) -> Chunk | None:
+        """the first chunk with that id"""
+        return next((chunk for chunk in self.chunks if chunk.chunk_id == chunk_id), None)
+
+    @property
+    def data_offset(self) -> int:
+        return self.find_chunk("data").offset
+
+
+def read_chunk_list(reader: Reader, file_size: int) -> list[Chunk]:
+    """Walks the chunks of a RIFF file, seeking over their payloads\n
+    the reader has to be positioned after the RIFF header"""
+    chunks = []
+    while reader.tell() + 8 <= file_size:
+        chunk_id = reader.read_n_chars(4)
+        size = reader.read_uint32()
+        offset = reader.tell()
+        # a size running past the end: truncated file or unpatched streaming header
+        chunks.append(Chunk(chunk_id, offset, min(size, file_size - offset)))
+        # chunks are padded to an even number of bytes
+        reader.seek(offset + size + (size & 1))
+    return chunks
+
+
+def probe(filename: str) -> WavInfo:
+    """Reads format, duration and chunk offsets of a WAV file,\n
+    unknown chunks (e.g. `bext`, `cue `, `smpl`, `JUNK`) are skipped by seeking"""
+    file_size = getsize(filename)
+    with Reader(filename) as reader:
+        # Master RIFF Chunk
+        if reader.read_n_chars(4) != "RIFF":
+            raise ValueError(f"{filename} is not a RIFF file!")
+        reader.read_uint32()   # number of bytes from here on
+        if reader.read_n_chars(4) != "WAVE":
+            raise ValueError(f"{filename} is not a WAVE file!")
+
+        chunks = read_chunk_list(reader, file_size)
+        fmt = next((chunk for chunk in chunks if chunk.chunk_id == "fmt "), None)
+        data = next((chunk for chunk in chunks if chunk.chunk_id == "data"), None)
+        if fmt is None or data is None:
+            raise ValueError(f"{filename} has no `fmt ` or `data` chunk!")
+
+        # Data format chunk
+        reader.seek(fmt.offset)
+        audio_fmt   = reader.read_uint16()   # 1: PCM int, 3: IEEE 754
+        channels    = reader.read_uint16()
+        # in Hz (Samples/Sekunde/Kanal = Blocks/Sekunde)
+        sample_rate = reader.read_uint32()
+        byte_p_sec  = reader.read_uint32()
+        # (Bytes/Block) (= channels * (bit_p_sample + 7) // 8)
+        bloc_width  = reader.read_uint16()
+        bit_p_sample = reader.read_uint16()
+
+        extensible = audio_fmt == WAVE_FORMAT_EXTENSIBLE
+        if extensible:
+            cb_size     = reader.read_uint16()   # size of the extension (22)
+            valid_bits  = reader.read_uint16()
+            channel_mask = reader.read_uint32()  # speaker positions
+            audio_fmt   = reader.read_uint16()   # SubFormat GUID, starting with the format tag
+
+    if channels == 0 or bloc_width == 0:
+        raise ValueError(f"{filename} has an invalid fmt chunk!")
+
+    return WavInfo(
+        filename=filename,
+        audio_fmt=audio_fmt,
+        channels=channels,
+        sample_rate=sample_rate,
+        bit_p_sample=bit_p_sample,
+        bloc_width=bloc_width,
+        bloc_n=data.size // bloc_width,
+        extensible=extensible,
+        chunks=chunks
+    )
+
+
+def probe_tree(dirname: str, *, workers: int = 8, suffix: str = ".wav") -> dict[str, WavInfo | None]:
+    """Probes every file ending in `suffix` below `dirname` on a thread pool\n
+    files that aren't readable WAVs map to None"""
+    filenames = [
+        join(root, name)
+        for root, _, names in walk(dirname)
+        for name in names if name.lower().endswith(suffix)
+    ]
+
+    def try_probe(filename: str) -> WavInfo | None:
+        try:
+            return probe(filename)
+        except (OSError, ValueError, IndexError):
+            return None
+
+    with ThreadPoolExecutor(workers) as executor:
+        return dict(zip(filenames, executor.map(try_probe, filenames)))
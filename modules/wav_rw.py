@@ -1,24 +1,95 @@
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from itertools import islice
-from typing import Self
+from typing import Iterator, Self, Sequence
 
-import pyaudio
+import numpy as np
 
+from .helpers import intervals_to_ints
 from .reader import Reader
+from .resampler import resample_blocks
+from .wav_info import (
+    SUBFORMAT_GUID_TAIL,
+    WAVE_FORMAT_EXTENSIBLE,
+    WAVE_FORMAT_IEEE_FLOAT,
+    WAVE_FORMAT_PCM,
+    probe
+)
 from .writer import Writer
 
 
+class BlocView(Sequence):
+    """Read-only view of a sample array as a sequence of blocs (tuples of samples)\n
+    only converts the blocs that are actually accessed"""
+    ITER_CHUNK = 4096
+
+    def __init__(self, samples: np.ndarray) -> None:
+        self.samples = samples
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def __getitem__(self, index: int | slice) -> tuple | Self:
+        if isinstance(index, slice):
+            return BlocView(self.samples[index])
+        return tuple(self.samples[index].tolist())
+
+    def __iter__(self) -> Iterator[tuple]:
+        for start in range(0, len(self.samples), self.ITER_CHUNK):
+            chunk = self.samples[start: start + self.ITER_CHUNK].tolist()
+            yield from map(tuple, chunk)
+
+
+class Int24View:
+    """Read-only 24 bit PCM samples on their raw bytes (e.g. a memory map of the data chunk),
+    of shape (bloc_n, channels) like AudioData.samples\n
+    indexing with slices and ints gives views, the samples are only decoded (to int32)
+    when they are converted to an array (`np.asarray`, `samples_to_intervals`, ...)"""
+    dtype = np.dtype("<i4")
+
+    def __init__(self, raw: np.ndarray) -> None:
+        """raw: uint8 of shape (bloc_n, channels, 3)"""
+        assert raw.ndim >= 2 and raw.shape[-1] == 3
+        self.raw = raw
+
+    @property
+    def shape(self) -> tuple:
+        return self.raw.shape[:-1]
+
+    @property
+    def ndim(self) -> int:
+        return self.raw.ndim - 1
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def __getitem__(self, index):
+        raw = self.raw[index]
+        if raw.ndim == 1:
+            # a single sample
+            return decode_int24(raw)[()]
+        return Int24View(raw)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        samples = decode_int24(self.raw)
+        return samples if dtype is None else samples.astype(dtype, copy=False)
+
+    def tolist(self) -> list:
+        return np.asarray(self).tolist()
+
+
 @dataclass
 class AudioData:
     byte_p_sample:  int
-    bloc_n:         int
-    # Blocs in the respective format (dependent on audio_fmt)
-    blocs:  list[tuple]
-    audio_fmt:      int = 1
+    # Samples as a typed array of shape (bloc_n, channels) (dtype dependent on audio_fmt)
+    # (an `Int24View` for lazily read 24 bit files)
+    samples:        np.ndarray | Int24View
+    audio_fmt:      int = WAVE_FORMAT_PCM
     channels:       int = 2
     sample_rate:    int = 48000
     bit_p_sample:   int = 16
+    # written with a WAVE_FORMAT_EXTENSIBLE header (audio_fmt is the SubFormat then)
+    extensible:     bool = False
 
     @classmethod
     def from_blocs(
@@ -26,151 +97,409 @@ class AudioData:
         blocs: list[tuple],
         channels: int = 2,
         sample_rate: int = 48000,
-        bit_p_sample: int = 16
+        bit_p_sample: int = 16,
+        audio_fmt: int = WAVE_FORMAT_PCM
     ) -> Self:
         byte_p_sample = ((bit_p_sample + 7) >> 3)
-        byte_p_bloc = byte_p_sample * channels
-        bloc_n = len(blocs)
+        samples = np.array(blocs, dtype=sample_dtype(byte_p_sample, audio_fmt)).reshape(-1, channels)
         return cls(
             byte_p_sample,
-            bloc_n,
-            blocs,
+            samples,
+            audio_fmt=audio_fmt,
             channels=channels,
-            sample_rate=sample_rate
+            sample_rate=sample_rate,
+            bit_p_sample=bit_p_sample
         )
-    
+
     @classmethod
-    def from_file(cls, filename: str) -> Self:
-        return read_wav_data(filename)
+    def from_intervals(
+        cls: Self,
+        values: np.ndarray,
+        channels: int = 2,
+        sample_rate: int = 48000,
+        bit_p_sample: int = 16,
+        audio_fmt: int = WAVE_FORMAT_PCM
+    ) -> Self:
+        """values: floats in [-1, 1], of shape (bloc_n, channels) or interleaved\n
+        quantized in one go (or not at all for audio_fmt 3)"""
+        byte_p_sample = ((bit_p_sample + 7) >> 3)
+        samples = intervals_to_samples(values, byte_p_sample, audio_fmt).reshape(-1, channels)
+        return cls(
+            byte_p_sample,
+            samples,
+            audio_fmt=audio_fmt,
+            channels=channels,
+            sample_rate=sample_rate,
+            bit_p_sample=bit_p_sample
+        )
     
-    def play(self):
-        """Plays the audio"""
-        bytestream = bytes().join(
-            samples_bloc_to_byte_bloc(samples, self.byte_p_sample, self.audio_fmt)
-            for samples in self.blocs
+    @classmethod
+    def from_file(cls, filename: str, *, lazy: bool = False) -> Self:
+        """lazy: memory-map the data chunk instead of reading it (see `read_wav_data`)"""
+        return read_wav_data(filename, lazy=lazy)
+
+    @property
+    def bloc_n(self) -> int:
+        return len(self.samples)
+
+    @property
+    def dur(self) -> float:
+        """duration in seconds"""
+        return self.bloc_n / self.sample_rate
+
+    def slice_blocs(self, start: int, stop: int | None = None) -> Self:
+        """AudioData of the blocs `[start, stop)`; a view, no samples are copied or read"""
+        return replace(self, samples=self.samples[start:stop])
+
+    def slice_t(self, start_t: float, stop_t: float | None = None) -> Self:
+        """like `slice_blocs`, but start and stop are in seconds"""
+        start = int(start_t * self.sample_rate)
+        stop = None if stop_t is None else int(stop_t * self.sample_rate)
+        return self.slice_blocs(start, stop)
+
+    def channel(self, index: int) -> np.ndarray:
+        """the samples of one channel as a strided view"""
+        return self.samples[:, index]
+
+    def resample(self, sample_rate: int, *, block_size: int = 1 << 16) -> Self:
+        """the audio converted to another sample rate (in the same sample format)\n
+        the samples are read and converted `block_size` blocs at a time"""
+        if sample_rate == self.sample_rate:
+            return self
+        blocks = (
+            samples_to_intervals(self.samples[start: start+block_size], self.byte_p_sample, self.audio_fmt)
+            for start in range(0, self.bloc_n, block_size)
         )
+        resampled = list(resample_blocks(blocks, self.sample_rate, sample_rate))
+        values = np.concatenate(resampled) if resampled else np.zeros((0, self.channels))
+        return replace(
+            self,
+            samples=intervals_to_samples(values, self.byte_p_sample, self.audio_fmt),
+            sample_rate=sample_rate
+        )
+
+    def intervals(self) -> np.ndarray:
+        """the samples as floats in [-1, 1], shape (bloc_n, channels)"""
+        return samples_to_intervals(self.samples, self.byte_p_sample, self.audio_fmt)
 
-        pya = pyaudio.PyAudio()
-        stream = pya.open(
-            format=pya.get_format_from_width(width=2),
+    @property
+    def blocs(self) -> BlocView:
+        """Blocs as tuples of ints (compatibility view on `samples`)"""
+        return BlocView(self.samples)
+    
+    def play(self, sink=None, *, buffer_size: int = 4096, queue_size: int = 4):
+        """Plays the audio buffer by buffer (see `player.StreamPlayer`)\n
+        sink: defaults to the sound card (`PyAudioSink`)"""
+        # player builds on this module
+        from .player import PyAudioSink, StreamPlayer
+
+        player = StreamPlayer(
+            PyAudioSink() if sink is None else sink,
             channels=self.channels,
-            rate=self.sample_rate,
-            output=True
+            sample_rate=self.sample_rate,
+            buffer_size=buffer_size,
+            queue_size=queue_size
         )
-        stream.write(bytestream)
-        stream.stop_stream()
-        stream.close()
-
-        pya.terminate()
+        buffers = (
+            samples_to_intervals(self.samples[start: start+buffer_size], self.byte_p_sample, self.audio_fmt)
+            for start in range(0, self.bloc_n, buffer_size)
+        )
+        return player.play_buffers(buffers)
     
     def save(self, filename: str):
         write_wav_data(filename, self)
 
 
+def sample_dtype(sample_width: int, audio_fmt: int = WAVE_FORMAT_PCM) -> np.dtype:
+    """dtype of the samples array\n
+    8 bit PCM is unsigned (as stored in WAV files), 24 bit PCM is widened to 32 bit"""
+    if audio_fmt == WAVE_FORMAT_IEEE_FLOAT:
+        match sample_width:
+            case 4:
+                return np.dtype("<f4")
+            case 8:
+                return np.dtype("<f8")
+        raise NotImplementedError(
+            f"float samples of {sample_width} bytes not implemented yet!")
+    if audio_fmt != WAVE_FORMAT_PCM:
+        raise NotImplementedError(
+            f"audiofmt of {audio_fmt} not implemented yet!")
+    match sample_width:
+        case 1:
+            return np.dtype(np.uint8)
+        case 2:
+            return np.dtype("<i2")
+        case 3 | 4:
+            return np.dtype("<i4")
+    raise NotImplementedError(
+        f"sample width of {sample_width} bytes not implemented yet!")
+
+
+def samples_to_intervals(samples: np.ndarray, sample_width: int, audio_fmt: int) -> np.ndarray:
+    """Converts samples (as in AudioData.samples) to floats in [-1, 1] at once"""
+    sample_dtype(sample_width, audio_fmt)  # unsupported formats
+    values = np.asarray(samples, dtype=np.float64)
+    if audio_fmt == WAVE_FORMAT_IEEE_FLOAT:
+        return values
+    if sample_width == 1:
+        values = values - 128
+    return values / (1 << (8*sample_width - 1))
+
+
+def intervals_to_samples(values: np.ndarray, sample_width: int, audio_fmt: int) -> np.ndarray:
+    """Converts floats in [-1, 1] to samples (as in AudioData.samples) at once"""
+    dtype = sample_dtype(sample_width, audio_fmt)
+    if audio_fmt == WAVE_FORMAT_IEEE_FLOAT:
+        return np.asarray(values, dtype=dtype)
+    ints = intervals_to_ints(values, 8*sample_width)
+    if sample_width == 1:
+        ints += 128
+    return ints.astype(dtype)
+
+
+def decode_int24(raw: np.ndarray) -> np.ndarray:
+    """little endian 24 bit samples: uint8 of shape (..., 3) -> int32 of shape (...)"""
+    samples = raw[..., 0].astype(np.int32)
+    samples |= raw[..., 1].astype(np.int32) << 8
+    samples |= raw[..., 2].view(np.int8).astype(np.int32) << 16  # sign extension
+    return samples
+
+
+def byte_data_to_samples(data: bytes, channels: int, sample_width: int, audio_fmt: int) -> np.ndarray:
+    """Decodes a whole data chunk at once\n
+    returns an array of shape (bloc_n, channels); trailing incomplete blocs are dropped"""
+    dtype = sample_dtype(sample_width, audio_fmt)
+    bloc_n = len(data) // (channels * sample_width)
+    data = data[:bloc_n * channels * sample_width]
+
+    if audio_fmt == WAVE_FORMAT_PCM and sample_width == 3:
+        flat = decode_int24(np.frombuffer(data, np.uint8).reshape(-1, 3))
+    else:
+        flat = np.frombuffer(data, dtype)
+    return flat.reshape(bloc_n, channels)
+
+
 def byte_bloc_to_samples_bloc(by_blo: bytes, channels: int, sample_width: int, audio_fmt: int) -> tuple:
     """len(by_blo) == channels * sample_width"""
-    if audio_fmt != 1:
+    if audio_fmt == WAVE_FORMAT_IEEE_FLOAT:
+        return tuple(byte_data_to_samples(by_blo, channels, sample_width, audio_fmt)[0].tolist())
+    if audio_fmt != WAVE_FORMAT_PCM:
         raise NotImplementedError(
             f"audiofmt of {audio_fmt} not implemented yet!")
+    signed = sample_width > 1  # 8 bit PCM is unsigned
     byte_samples = [by_blo[i*sample_width: (i+1)*sample_width] for i in range(channels)]
-    return tuple(int.from_bytes(sam, "little", signed=True) for sam in byte_samples)
+    return tuple(int.from_bytes(sam, "little", signed=signed) for sam in byte_samples)
 
 
 def samples_bloc_to_byte_bloc(samples_bloc: tuple[int], sample_width: int, audio_fmt: int) -> bytes:
     """len(samples_bloc) == channels"""
-    if audio_fmt != 1:
+    if audio_fmt == WAVE_FORMAT_IEEE_FLOAT:
+        return samples_to_byte_data(samples_bloc, sample_width, audio_fmt)
+    if audio_fmt != WAVE_FORMAT_PCM:
         raise NotImplementedError(
             f"audiofmt of {audio_fmt} not implemented yet!")
 
-    byte_samples = [sample.to_bytes(sample_width, "little", signed=True) for sample in samples_bloc]
+    signed = sample_width > 1  # 8 bit PCM is unsigned
+    byte_samples = [sample.to_bytes(sample_width, "little", signed=signed) for sample in samples_bloc]
     return bytes().join(byte_samples)
 
 
-def read_wav_data(from_filename: str) -> AudioData:
-    with Reader(from_filename) as reader:
-        # Master RIFF Chunk
-        file_type = reader.read_n_chars(4)
-        assert file_type == "RIFF"
-        file_size = reader.read_uint32()   # number of bytes from here on
-        file_fmt = reader.read_n_chars(4)
-        assert file_fmt == "WAVE"
-
-        # Data format chunk
-        fmt_bloc_id = reader.read_n_chars(4)
-        assert fmt_bloc_id == "fmt "
-        chunk_size  = reader.read_uint32()   # Größe des übrigen chunks
-        audio_fmt   = reader.read_uint16()   # 1: PCM int, 3: IEEE 754
-        channels    = reader.read_uint16()
-        # in Hz (Samples/Sekunde/Kanal = Blocks/Sekunde)
-        sample_rate = reader.read_uint32()
-        byte_p_sec  = reader.read_uint32()   # ???
-        # (Bytes/Block) (= channels * (bit_p_sample + 7) // 8)
-        bloc_width  = reader.read_uint16()
-        bit_p_sample = reader.read_uint16()
-
-        # Data chunk
-        nextbloc_id = reader.read_n_chars(4)
-        if nextbloc_id != "data":
-            assert nextbloc_id == "LIST"
-            bloc_size = reader.read_uint32()
-            reader.skip_n(bloc_size)
-
-            databloc_id = reader.read_n_chars(4)
-            assert databloc_id == "data"
-        
-        data_size   = reader.read_uint32()   # number of bytes in the next section
-        bloc_n      = data_size//bloc_width
-        byte_p_sample = bloc_width//channels
-
-        # Sampled data
-        # # Bloc = [sample_channel0, sample_channel1, ...]
-        bloc_it = islice(reader.read_blocks_of_n(bloc_width), bloc_n)
-        blocks = [byte_bloc_to_samples_bloc(
-            bloc, channels, byte_p_sample, audio_fmt) for bloc in bloc_it]
+def read_wav_data(from_filename: str, *, lazy: bool = False) -> AudioData:
+    """lazy: the samples are a read-only memory map of the data chunk,\n
+    so only the parts that are accessed are ever read from disk\n
+    (24 bit PCM samples have no matching dtype, they are mapped as bytes and decoded on access, see `Int24View`)"""
+    info = probe(from_filename)
+    byte_p_sample = info.byte_p_sample
 
-        return AudioData(
-            audio_fmt=audio_fmt,
-            channels=channels,
-            sample_rate=sample_rate,
-            bit_p_sample=bit_p_sample,
-            byte_p_sample=byte_p_sample,
-            bloc_n=bloc_n,
-            blocs=blocks
+    # Sampled data
+    # # Bloc = [sample_channel0, sample_channel1, ...]
+    if lazy and byte_p_sample == 3 and info.audio_fmt == WAVE_FORMAT_PCM and info.bloc_n > 0:
+        samples = Int24View(np.memmap(
+            from_filename,
+            dtype=np.uint8,
+            mode="r",
+            offset=info.data_offset,
+            shape=(info.bloc_n, info.channels, 3)
+        ))
+    elif lazy and info.bloc_n > 0:
+        samples = np.memmap(
+            from_filename,
+            dtype=sample_dtype(byte_p_sample, info.audio_fmt),
+            mode="r",
+            offset=info.data_offset,
+            shape=(info.bloc_n, info.channels)
         )
+    else:
+        with Reader(from_filename) as reader:
+            reader.seek(info.data_offset)
+            data = reader.read_n_bytes(info.bloc_n * info.bloc_width)
+        samples = byte_data_to_samples(data, info.channels, byte_p_sample, info.audio_fmt)
+
+    return AudioData(
+        audio_fmt=info.audio_fmt,
+        channels=info.channels,
+        sample_rate=info.sample_rate,
+        bit_p_sample=info.bit_p_sample,
+        byte_p_sample=byte_p_sample,
+        samples=samples,
+        extensible=info.extensible
+    )
+
 
+def samples_to_byte_data(samples: np.ndarray, sample_width: int, audio_fmt: int) -> bytes:
+    """Encodes an array of samples (as stored in AudioData.samples) at once"""
+    samples = np.asarray(samples, dtype=sample_dtype(sample_width, audio_fmt))
+    if audio_fmt == WAVE_FORMAT_PCM and sample_width == 3:
+        # cut off the highest byte of every (little endian) 32 bit sample
+        return samples.reshape(-1, 1).view(np.uint8)[:, :3].tobytes()
+    return samples.tobytes()
 
-def write_wav_data(to_filename: str, data: AudioData):
-    with Writer(to_filename) as writer:
 
-        bloc_width = data.channels * ((data.bit_p_sample + 7) >> 3)
-        byte_p_sec = data.sample_rate * bloc_width
-        data_size = data.bloc_n * bloc_width
+def write_wav_header(
+        writer: Writer,
+        data_size: int,
+        audio_fmt: int,
+        channels: int,
+        sample_rate: int,
+        bit_p_sample: int,
+        extensible: bool = False
+    ) -> int:
+    """extensible: write a WAVE_FORMAT_EXTENSIBLE fmt chunk, with audio_fmt as SubFormat\n
+    returns the offset of the data size field (the data itself starts 4 bytes later)"""
+    bloc_width = channels * ((bit_p_sample + 7) >> 3)
+    byte_p_sec = sample_rate * bloc_width
+    fmt_size = 40 if extensible else 16
 
-        # Master RIFF Chunk
-        writer.write_chars("RIFF")  # file_type
-        writer.write_uint32(data_size + 36)  # number of bytes from here on
-        writer.write_chars("WAVE")  # file_fmt
+    # Master RIFF Chunk
+    writer.write_chars("RIFF")  # file_type
+    writer.write_uint32(data_size + fmt_size + 20)  # number of bytes from here on
+    writer.write_chars("WAVE")  # file_fmt
 
-        # Data format chunk
-        writer.write_chars("fmt ")
-        writer.write_uint32(16)  # chunk_size # Größe des übrigen chunks
-        writer.write_uint16(data.audio_fmt)
-        writer.write_uint16(data.channels)
-        writer.write_uint32(data.sample_rate)
-        writer.write_uint32(byte_p_sec)
-        writer.write_uint16(bloc_width)
-        writer.write_uint16(data.bit_p_sample)
+    # Data format chunk
+    writer.write_chars("fmt ")
+    writer.write_uint32(fmt_size)  # chunk_size # Größe des übrigen chunks
+    writer.write_uint16(WAVE_FORMAT_EXTENSIBLE if extensible else audio_fmt)
+    writer.write_uint16(channels)
+    writer.write_uint32(sample_rate)
+    writer.write_uint32(byte_p_sec)
+    writer.write_uint16(bloc_width)
+    writer.write_uint16(bit_p_sample)
+    if extensible:
+        writer.write_uint16(22)  # cbSize
+        writer.write_uint16(bit_p_sample)  # valid bits
+        # speakers in the default order (front left, front right, center, ...)
+        writer.write_uint32((1 << channels) - 1 if channels <= 18 else 0)
+        writer.write_uint16(audio_fmt)
+        writer.write_bytes(SUBFORMAT_GUID_TAIL)
 
-        # Data chunk
-        writer.write_chars("data")
-        writer.write_uint32(data_size)  # number of bytes in the next section
+    # Data chunk
+    writer.write_chars("data")
+    data_size_offset = writer.tell()
+    writer.write_uint32(data_size)  # number of bytes in the next section
+    return data_size_offset
+
+
+def write_wav_data(to_filename: str, data: AudioData, *, buffer_size: int = 1 << 16):
+    """buffer_size: number of bytes encoded and written at once"""
+    with Writer(to_filename, buffer_size=buffer_size) as writer:
+        bloc_width = data.channels * data.byte_p_sample
+        write_wav_header(
+            writer,
+            data.bloc_n * bloc_width,
+            data.audio_fmt,
+            data.channels,
+            data.sample_rate,
+            data.bit_p_sample,
+            data.extensible
+        )
 
         # Sampled data
         # # Bloc = [sample_channel0, sample_channel1, ...]
-        for samples_bloc in data.blocs:
-            byte_bloc = samples_bloc_to_byte_bloc(
-                samples_bloc,
-                data.byte_p_sample,
-                data.audio_fmt
-            )
-            writer.write_bytes(byte_bloc)
+        blocs_p_write = max(buffer_size // bloc_width, 1)
+        for start in range(0, data.bloc_n, blocs_p_write):
+            chunk = data.samples[start: start + blocs_p_write]
+            writer.write_bytes(samples_to_byte_data(chunk, data.byte_p_sample, data.audio_fmt))
+
+
+class WavStreamWriter:
+    """Writes a WAV file chunk by chunk, without knowing the number of blocs in advance:\n
+    the header is written with placeholder sizes, which are patched when closing"""
+    def __init__(
+            self,
+            filename: str, *,
+            channels: int = 2,
+            sample_rate: int = 48000,
+            bit_p_sample: int = 16,
+            audio_fmt: int = WAVE_FORMAT_PCM,
+            extensible: bool = False,
+            buffer_size: int = 1 << 16
+        ) -> None:
+        self.writer = Writer(filename, buffer_size=buffer_size)
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.bit_p_sample = bit_p_sample
+        self.byte_p_sample = (bit_p_sample + 7) >> 3
+        self.audio_fmt = audio_fmt
+        self.extensible = extensible
+        self.bloc_n = 0
+        self._data_size_offset = 0
+
+    def __enter__(self):
+        self.writer.__enter__()
+        self._data_size_offset = write_wav_header(
+            self.writer,
+            0,
+            self.audio_fmt,
+            self.channels,
+            self.sample_rate,
+            self.bit_p_sample,
+            self.extensible
+        )
+        return self
+
+    def __exit__(self, typus, value, traceback):
+        if not traceback:
+            self._patch_sizes()
+        return self.writer.__exit__(typus, value, traceback)
+
+    def _patch_sizes(self):
+        data_size = self.bloc_n * self.channels * self.byte_p_sample
+        self.writer.seek(4)
+        # RIFF size: everything after its own field
+        self.writer.write_uint32(data_size + self._data_size_offset - 4)
+        self.writer.seek(self._data_size_offset)
+        self.writer.write_uint32(data_size)
+
+    def write_samples(self, samples: np.ndarray):
+        """samples: array of shape (n, channels) in the format of AudioData.samples"""
+        samples = np.asarray(samples).reshape(-1, self.channels)
+        self.writer.write_bytes(samples_to_byte_data(samples, self.byte_p_sample, self.audio_fmt))
+        self.bloc_n += len(samples)
+
+    def write_blocs(self, blocs: Iterator[tuple[int]], *, chunk_size: int = 4096):
+        """consumes the blocs `chunk_size` at a time"""
+        blocs = iter(blocs)
+        while chunk := list(islice(blocs, chunk_size)):
+            self.write_samples(np.array(chunk))
+
+
+def write_wav_stream(
+        to_filename: str,
+        blocs: Iterator[tuple[int]], *,
+        channels: int = 2,
+        sample_rate: int = 48000,
+        bit_p_sample: int = 16,
+        audio_fmt: int = WAVE_FORMAT_PCM,
+        chunk_size: int = 4096
+    ) -> int:
+    """Writes the blocs as they come in, in constant memory\n
+    returns the number of blocs written"""
+    with WavStreamWriter(
+        to_filename,
+        channels=channels,
+        sample_rate=sample_rate,
+        bit_p_sample=bit_p_sample,
+        audio_fmt=audio_fmt
+    ) as stream:
+        stream.write_blocs(blocs, chunk_size=chunk_size)
+    return stream.bloc_n
@@ -0,0 +1,84 @@
+
+"""Wavetables: one cycle of a waveform, sampled once and then read at any frequency\n
+the oscillators (`sound_generator.TableWave`, `sound_generator.MultiTableWave`) compute the phases
+of a whole block at once and interpolate between the table entries"""
+
+from functools import lru_cache
+from hashlib import sha1
+from typing import Callable, Self
+
+import numpy as np
+
+TABLE_SIZE = 2048
+INTERPOLATIONS = ("linear", "cubic")
+
+
+class Wavetable:
+    """One cycle of a waveform, sampled at the phases `k/size` (repeated periodically)\n
+    mipmap: level j keeps only the harmonics up to `size/2 >> j`,
+    an oscillator reads the first level whose harmonics all stay below the nyquist frequency
+    (so high notes don't alias, at the price of up to an octave of missing top harmonics)\n
+    the band-limited levels of waves with jumps overshoot a little (gibbs), like the cubic interpolation"""
+    def __init__(self, cycle: list[float] | np.ndarray) -> None:
+        self.cycle = np.array(cycle, dtype=np.float64)
+        assert self.cycle.ndim == 1 and len(self.cycle) >= 4, "a cycle needs at least 4 samples"
+        self.size = len(self.cycle)
+        self._levels: dict[int, np.ndarray] = {}
+
+    @classmethod
+    def from_function(cls, wave_fun: Callable[[float], float], size: int = TABLE_SIZE) -> Self:
+        """wave_fun: phase function [0, 1) -> [-1, 1] (like `sound_generator.SAWTOOTH_WAVE`)"""
+        return cls([wave_fun(k / size) for k in range(size)])
+
+    def key(self) -> tuple:
+        """equal for equal cycles (see `track.structural_key`)"""
+        return ("Wavetable", sha1(self.cycle.tobytes()).hexdigest())
+
+    def level_for(self, f: float, sample_rate: int) -> int:
+        max_harmonic = sample_rate / 2 / f
+        level = 0
+        while (self.size // 2 >> level) > max(max_harmonic, 1):
+            level += 1
+        return level
+
+    def table(self, level: int) -> np.ndarray:
+        """the cycle of mipmap level `level`, padded (wrapping around) with 1 sample before and 3 after,
+        as `lookup` expects it"""
+        padded = self._levels.get(level)
+        if padded is None:
+            values = self.cycle
+            if level > 0:
+                spectrum = np.fft.rfft(self.cycle)
+                spectrum[(self.size // 2 >> level) + 1:] = 0
+                values = np.fft.irfft(spectrum, self.size)
+            padded = self._levels[level] = np.concatenate([values[-1:], values, values[:3]])
+        return padded
+
+
+@lru_cache(maxsize=64)
+def wavetable(wave_fun: Callable[[float], float], size: int = TABLE_SIZE) -> Wavetable:
+    """the Wavetable of `wave_fun`, sampled once per (wave_fun, size)"""
+    return Wavetable.from_function(wave_fun, size)
+
+
+def _interpolate(y0, y1, y2, y3, frac, interpolation: str):
+    if interpolation == "linear":
+        return y1 + frac * (y2 - y1)
+    # catmull-rom
+    return y1 + 0.5 * frac * (y2 - y0 + frac * (2*y0 - 5*y1 + 4*y2 - y3 + frac * (3*(y1 - y2) + y3 - y0)))
+
+def lookup(table: np.ndarray, phases: np.ndarray, interpolation: str = "linear") -> np.ndarray:
+    """the values of the padded `table` (see `Wavetable.table`) at `phases` in [0, 1]"""
+    pos = phases * (len(table) - 4)
+    i = pos.astype(np.intp)
+    frac = pos - i
+    i += 1
+    return _interpolate(table[i-1], table[i], table[i+1], table[i+2], frac, interpolation)
+
+def lookup_one(table: np.ndarray, phase: float, interpolation: str = "linear") -> float:
+    """`lookup` for a single phase"""
+    pos = phase * (len(table) - 4)
+    i = int(pos)
+    frac = pos - i
+    y0, y1, y2, y3 = table[i: i+4].tolist()
+    return _interpolate(y0, y1, y2, y3, frac, interpolation)
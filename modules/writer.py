@@ -1,10 +1,15 @@
+from itertools import islice
 from typing import Iterator
 
 
 class Writer:
-    def __init__(self, filename: str) -> None:
+    """Buffered: small writes (e.g. the header fields) are collected
+    and only written to the file once `buffer_size` bytes came together"""
+    def __init__(self, filename: str, *, buffer_size: int = 1 << 16) -> None:
         self.filename = filename
         self.file_obj = None
+        self.buffer_size = buffer_size
+        self._buffer = bytearray()
 
     def __enter__(self):
         self.file_obj = open(self.filename, "wb")
@@ -14,25 +19,37 @@ class Writer:
         if traceback:
             raise value
         assert self.file_obj is not None
+        self.flush()
         self.file_obj.close()
         return True
 
-    def write_chars(self, chars: str):
+    def flush(self):
         assert self.file_obj
-        self.file_obj.write(chars.encode())
+        if self._buffer:
+            self.file_obj.write(self._buffer)
+            self._buffer.clear()
+
+    def write_chars(self, chars: str):
+        self.write_bytes(chars.encode())
 
     def write_byte(self, by: int):
-        assert self.file_obj
-        buffer = bytes([by])
-        self.file_obj.write(buffer)
+        self.write_bytes(bytes([by]))
 
     def write_bytes(self, bys: bytes):
         assert self.file_obj
-        self.file_obj.write(bys)
+        if len(bys) >= self.buffer_size:
+            # big blocks go straight to the file instead of being copied into the buffer
+            self.flush()
+            self.file_obj.write(bys)
+            return
+        self._buffer += bys
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
 
     def write_iterator(self, it: Iterator[int]):
-        for by in it:
-            self.write_byte(by)
+        it = iter(it)
+        while chunk := bytes(islice(it, self.buffer_size)):
+            self.write_bytes(chunk)
 
     def write_uint16(self, num: int):
         """Little endian"""
@@ -41,4 +58,13 @@ class Writer:
     def write_uint32(self, num: int):
         """Little endian"""
         self.write_bytes(num.to_bytes(4, "little"))
-    
+
+    def tell(self) -> int:
+        """current byte offset in the file (including the buffered bytes)"""
+        assert self.file_obj
+        return self.file_obj.tell() + len(self._buffer)
+
+    def seek(self, offset: int):
+        """moves to an absolute byte offset, e.g. to patch an already written header"""
+        self.flush()
+        self.file_obj.seek(offset)